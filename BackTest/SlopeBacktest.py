@@ -1,10 +1,12 @@
-import pandas as pd
-import requests
 import json
 import os
+import sys
 import argparse
-from datetime import datetime, timedelta
-import numpy as np
+
+# Make the shared modules in the repository root importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from BacktestEngine import load_price_history, simulate, stop_settings, compute_performance_metrics, save_results, cached_backtest
+from Indicators import calculate_slope, sma
 
 # Define the path to the configuration file
 config_file_path = os.path.join(os.path.dirname(__file__), 'config.json')
@@ -20,168 +22,59 @@ INITIAL_CASH = config['INITIAL_CASH']
 PERCENT_TO_INVEST = config['PERCENT_TO_INVEST']
 PERCENT_STOP_LOSS = config['PERCENT_STOP_LOSS']
 STRATEGY_TITLE = 'Sophisticated SMA Slope Strategy with Positioning'
-
-# Parse command-line arguments
-parser = argparse.ArgumentParser(description='SMA Slope Backtesting Script')
-parser.add_argument('symbol', type=str, help='Stock symbol to backtest')
-args = parser.parse_args()
-
-SYMBOL = args.symbol
+# Bump when the signal logic changes so cached results are recomputed
+STRATEGY_VERSION = 1
+RESULTS_DIR = 'SMASlopeResults'
 SMA_LENGTH = 20
 SLOPE_LENGTH = 20
 
-# Calculate date range
-END_DATE = datetime.now()
-START_DATE = END_DATE - timedelta(days=YEARS_TO_LOOK_BACK * 365)
-
-# Fetch historical stock data
-URL = f'https://financialmodelingprep.com/api/v3/historical-price-full/{SYMBOL}?from={START_DATE.strftime("%Y-%m-%d")}&to={END_DATE.strftime("%Y-%m-%d")}&apikey={API_KEY}'
-response = requests.get(URL)
-data = response.json()
-
-# Convert data to DataFrame
-df = pd.DataFrame(data['historical'])
-df['date'] = pd.to_datetime(df['date'])
-df.set_index('date', inplace=True)
-df = df.sort_index()
-
-# Calculate SMA
-df['SMA'] = df['close'].rolling(window=SMA_LENGTH).mean()
-
-# Calculate the slope using linear regression
-def calculate_slope(series, length):
-    x = np.arange(length)
-    slopes = [np.nan] * (length - 1)
-    for i in range(length, len(series) + 1):
-        y = series[i-length:i]
-        if len(y.dropna()) == length:
-            slope = np.polyfit(x, y, 1)[0]
-            slopes.append(slope)
-        else:
-            slopes.append(np.nan)
-    return np.array(slopes)
-
-df['Slope'] = calculate_slope(df['SMA'], SLOPE_LENGTH)
-df['Positive_Slope_Change'] = (df['Slope'] > 0) & (df['Slope'].shift(1) <= 0)
-df['Negative_Slope_Change'] = (df['Slope'] < 0) & (df['Slope'].shift(1) >= 0)
-
-# Generate buy/sell signals
-df['Signal'] = 0
-df.loc[df['Positive_Slope_Change'], 'Signal'] = 1  # Buy signal
-df.loc[df['Negative_Slope_Change'], 'Signal'] = -1  # Sell signal
-
-# Correctly set the Position column
-df['Position'] = df['Signal'].shift().fillna(0)
-
-# Initialize backtesting variables
-cash = INITIAL_CASH
-account_value = INITIAL_CASH
-shares = 0
-trades = []
-
-# Backtest the strategy
-for i in range(1, len(df)):
-    if df['Position'].iloc[i] == 1 and df['Position'].iloc[i-1] != 1:  # Buy signal
-        amount_to_invest = account_value * PERCENT_TO_INVEST
-        shares = amount_to_invest // df['close'].iloc[i]
-        stop_loss_price = df['close'].iloc[i] * (1 - PERCENT_STOP_LOSS)
-        cash -= shares * df['close'].iloc[i]
-        trades.append({
-            'type': 'buy',
-            'date': df.index[i],
-            'price': df['close'].iloc[i],
-            'shares': shares,
-            'stop_loss': stop_loss_price
-        })
-    elif df['Position'].iloc[i] == -1 and df['Position'].iloc[i-1] != -1 and shares > 0:  # Sell signal
-        cash += shares * df['close'].iloc[i]
-        trades.append({
-            'type': 'sell',
-            'date': df.index[i],
-            'price': df['close'].iloc[i],
-            'shares': shares,
-            'stopped_out': False
-        })
-        shares = 0
-    '''
-    elif shares > 0 and df['close'].iloc[i] <= trades[-1]['stop_loss']:  # Stop loss condition
-        cash += shares * df['close'].iloc[i]
-        trades.append({
-            'type': 'sell',
-            'date': df.index[i],
-            'price': df['close'].iloc[i],
-            'shares': shares,
-            'stopped_out': True
-        })
-        shares = 0
-    '''
-    account_value = cash + shares * df['close'].iloc[i]
-
-# Create trading log DataFrame
-trade_log = []
-for i in range(1, len(trades), 2):
-    buy_trade = trades[i-1]
-    sell_trade = trades[i]
-    profit = (sell_trade['price'] - buy_trade['price']) * buy_trade['shares']
-    trade_log.append({
-        'Date Bought': buy_trade['date'],
-        'Date Sold': sell_trade['date'],
-        'Quantity': buy_trade['shares'],
-        'Entry Price': buy_trade['price'],
-        'Exit Price': sell_trade['price'],
-        'Profit/Loss': profit,
-        'Stopped Out': sell_trade.get('stopped_out', False)
-    })
-
-trade_log_df = pd.DataFrame(trade_log)
-
-# Compute performance metrics
-total_trades = len(trade_log_df)
-profitable_trades = len(trade_log_df[trade_log_df['Profit/Loss'] > 0])
-percent_profitable = (profitable_trades / total_trades) * 100 if total_trades > 0 else 0
-
-gross_profit = trade_log_df[trade_log_df['Profit/Loss'] > 0]['Profit/Loss'].sum()
-gross_loss = trade_log_df[trade_log_df['Profit/Loss'] <= 0]['Profit/Loss'].sum()
-profit_factor = (gross_profit / abs(gross_loss)) if gross_loss != 0 else float('inf')
-
-total_profit_loss = trade_log_df['Profit/Loss'].sum()
-
-# Performance metrics dictionary
-performance_metrics = {
-    'Strategy Title': STRATEGY_TITLE,
-    'Symbol': SYMBOL,
-    'SMA Length': SMA_LENGTH,
-    'Slope Length': SLOPE_LENGTH,
-    'Total Trades': total_trades,
-    'Percent Profitable': percent_profitable,
-    'Profit Factor': profit_factor,
-    'Total Profit/Loss': total_profit_loss
-}
-
-# Define directories
-results_dir = 'SMASlopeResults'
-symbol_dir = os.path.join(results_dir, SYMBOL)
-timestamp_dir = os.path.join(symbol_dir, datetime.now().strftime('%Y%m%d%H%M%S'))
-
-# Create directories if they do not exist
-os.makedirs(timestamp_dir, exist_ok=True)
-
-# Save trading log to CSV
-trade_log_csv_path = os.path.join(timestamp_dir, 'trading_log.csv')
-trade_log_df.to_csv(trade_log_csv_path, index=False)
-
-# Save performance metrics to JSON
-performance_metrics_json_path = os.path.join(timestamp_dir, 'performance_metrics.json')
-with open(performance_metrics_json_path, 'w') as f:
-    json.dump(performance_metrics, f, indent=4)
-
-# Save the configuration file to the same directory
-config_json_path = os.path.join(timestamp_dir, 'config.json')
-with open(config_json_path, 'w') as f:
-    json.dump(config, f, indent=4)
-
-# Print performance metrics
-print(performance_metrics)
-
-# Print the first few rows of the trading log
-print(trade_log_df.head())
+def generate_signals(df, sma_length=SMA_LENGTH, slope_length=SLOPE_LENGTH):
+    # Calculate SMA
+    df['SMA'] = sma(df, sma_length)
+
+    # Calculate the slope using linear regression
+    df['Slope'] = calculate_slope(df['SMA'], slope_length)
+    df['Positive_Slope_Change'] = (df['Slope'] > 0) & (df['Slope'].shift(1) <= 0)
+    df['Negative_Slope_Change'] = (df['Slope'] < 0) & (df['Slope'].shift(1) >= 0)
+
+    # Generate buy/sell signals
+    df['Signal'] = 0
+    df.loc[df['Positive_Slope_Change'], 'Signal'] = 1  # Buy signal
+    df.loc[df['Negative_Slope_Change'], 'Signal'] = -1  # Sell signal
+    return df
+
+def backtest(symbol):
+    def compute(df):
+        df = generate_signals(df)
+        trade_log_df, account_value = simulate(df, INITIAL_CASH, PERCENT_TO_INVEST, **stop_settings(config))
+
+        # Performance metrics dictionary
+        performance_metrics = {
+            'Strategy Title': STRATEGY_TITLE,
+            'Symbol': symbol,
+            'SMA Length': SMA_LENGTH,
+            'Slope Length': SLOPE_LENGTH,
+            **compute_performance_metrics(trade_log_df, account_value)
+        }
+        return trade_log_df, performance_metrics
+
+    df = load_price_history(symbol, API_KEY, YEARS_TO_LOOK_BACK)
+    return cached_backtest(df, STRATEGY_TITLE, STRATEGY_VERSION, [symbol, SMA_LENGTH, SLOPE_LENGTH], config, compute)
+
+def save(symbol, trade_log_df, performance_metrics):
+    return save_results(RESULTS_DIR, symbol, trade_log_df, performance_metrics, config=config)
+
+if __name__ == '__main__':
+    # Parse command-line arguments
+    parser = argparse.ArgumentParser(description='SMA Slope Backtesting Script')
+    parser.add_argument('symbol', type=str, help='Stock symbol to backtest')
+    args = parser.parse_args()
+
+    trade_log_df, performance_metrics = backtest(args.symbol)
+    save(args.symbol, trade_log_df, performance_metrics)
+
+    # Print performance metrics
+    print(performance_metrics)
+
+    # Print the first few rows of the trading log
+    print(trade_log_df.head())
@@ -0,0 +1,178 @@
+import json
+import os
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from DataCache import fetch_historical_data
+from ResultCache import result_key, load_result, store_result
+from TradeLedger import TradeLedger, SIGNAL, STOP
+from PerformanceMetrics import trade_metrics, performance_metrics
+
+# Bump when simulate() or the metrics change so cached backtest results are recomputed
+ENGINE_VERSION = 3
+
+TRADE_LOG_COLUMNS = ['Date Bought', 'Date Sold', 'Quantity', 'Entry Price', 'Exit Price', 'Profit/Loss', 'Stopped Out', 'Exit Reason']
+
+def load_price_history(symbol, api_key, years_to_look_back):
+    """Daily bars for the backtest window ending today, read through the shared price cache"""
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=years_to_look_back * 365)
+    return fetch_historical_data(symbol, api_key, start_date, end_date)
+
+def simulate(df, initial_cash, percent_to_invest, stop_loss=None, trailing_stop=None):
+    """Simulate the positioning rules shared by every backtest script.
+
+    df needs a 'close' column and a 'Signal' column of 1 (buy), -1 (sell) and 0.
+    The position is the signal shifted by one bar. On the first bar of a long
+    position PERCENT_TO_INVEST of the current account value is invested in whole
+    shares, unless a position is already open, and on the first bar of a sell
+    position any shares held are sold. Account value only changes on those
+    bars, so the state is only advanced on them and the bar-level account
+    value is filled in with array operations.
+
+    stop_loss and trailing_stop are fractions below the entry price and below
+    the highest high since the entry; a position is stopped out on the first
+    bar whose 'low' reaches the stop (see stop_exit). Both are off when None.
+
+    Returns the trade log DataFrame (one row per position, including one still
+    open at the end) and the account value Series.
+    """
+    close = df['close'].to_numpy(dtype=float)
+    signal = df['Signal'].to_numpy(dtype=float)
+    # Without intrabar prices the stops can only be checked against the close
+    open_, high, low = (df[column].to_numpy(dtype=float) if column in df else close for column in ('open', 'high', 'low'))
+    ledger = simulate_trades(close, signal, initial_cash, percent_to_invest, stop_loss, trailing_stop, open_, high, low)
+
+    cash_curve, shares_curve = ledger.cash_and_shares(len(close), initial_cash)
+    account_value = pd.Series(cash_curve + shares_curve * close, index=df.index, name='Account Value')
+    return ledger.trade_log(df.index), account_value
+
+def simulate_trades(close, signal, initial_cash, percent_to_invest, stop_loss=None, trailing_stop=None, open_=None, high=None, low=None):
+    """The positions simulate() takes, from close and Signal arrays (and open/high/low arrays when stops are on).
+
+    Returns a TradeLedger. Cheap enough to call for every parameter
+    combination and window of a search without building DataFrames.
+    """
+    entering, exiting = position_changes(signal)
+    events = np.flatnonzero(entering | exiting)
+    exits = np.flatnonzero(exiting)
+    stops = bool(stop_loss) or bool(trailing_stop)
+    ledger = TradeLedger()
+    cash = float(initial_cash)
+    shares = 0.0
+    trade = None
+    # (bar, price) of the stop that will close the open position before its next sell bar
+    pending_stop = None
+    for i in events:
+        price = close[i]
+        if pending_stop is not None and pending_stop[0] <= i:
+            # Stops trigger intrabar, before anything filled at this bar's close
+            cash += shares * pending_stop[1]
+            ledger.close(trade, pending_stop[0], pending_stop[1], STOP)
+            shares = 0.0
+            pending_stop = None
+        if entering[i] and shares == 0:
+            shares = (cash * percent_to_invest) // price
+            if shares == 0:
+                continue
+            cash -= shares * price
+            trade = ledger.open(i, price, shares)
+            if stops:
+                # The position is held until the next sell bar, which may be stopped out first
+                next_exit = np.searchsorted(exits, i, side='right')
+                end = exits[next_exit] + 1 if next_exit < len(exits) else len(close)
+                stop_bar, stop_price = stop_exit(price, open_[i + 1:end], high[i + 1:end], low[i + 1:end], stop_loss, trailing_stop)
+                if stop_bar is not None:
+                    pending_stop = (i + 1 + stop_bar, stop_price)
+        elif exiting[i] and shares > 0:
+            cash += shares * price
+            ledger.close(trade, i, price, SIGNAL)
+            shares = 0.0
+    if pending_stop is not None:
+        ledger.close(trade, pending_stop[0], pending_stop[1], STOP)
+    return ledger
+
+def stop_exit(entry_price, open_, high, low, stop_loss=None, trailing_stop=None):
+    """First bar after an entry where a stop is hit, and its fill price, or (None, None).
+
+    open_, high and low cover the bars the position is held for. The stop
+    level of a bar is the higher of entry_price * (1 - stop_loss) and the
+    highest price before that bar (the entry price or an earlier high) times
+    (1 - trailing_stop). A bar whose low reaches the level fills at the level,
+    or at its open when it gaps down through it. The whole holding period is
+    checked with array operations, not bar by bar.
+    """
+    levels = np.full(len(low), -np.inf)
+    if stop_loss:
+        levels[:] = entry_price * (1 - stop_loss)
+    if trailing_stop:
+        peak = np.maximum.accumulate(np.concatenate(([entry_price], high[:-1])))
+        levels = np.maximum(levels, peak * (1 - trailing_stop))
+    hit = np.flatnonzero(low <= levels)
+    if not len(hit):
+        return None, None
+    bar = hit[0]
+    return bar, min(open_[bar], levels[bar])
+
+def stop_settings(config):
+    """simulate() stop arguments from a BackTest configuration: USE_STOP_LOSS turns on PERCENT_STOP_LOSS,
+    and a PERCENT_TRAILING_STOP other than 0 turns on the trailing stop"""
+    return {
+        'stop_loss': config['PERCENT_STOP_LOSS'] if config.get('USE_STOP_LOSS') else None,
+        'trailing_stop': config.get('PERCENT_TRAILING_STOP') or None
+    }
+
+def position_changes(signal):
+    """Bars where the position (the signal shifted by one bar) turns long and where it turns to sell"""
+    n = len(signal)
+    position = np.zeros(n)
+    position[1:] = signal[:-1]
+    entering = np.zeros(n, dtype=bool)
+    exiting = np.zeros(n, dtype=bool)
+    entering[1:] = (position[1:] == 1) & (position[:-1] != 1)
+    exiting[1:] = (position[1:] == -1) & (position[:-1] != -1)
+    return entering, exiting
+
+def compute_performance_metrics(trade_log_df, account_value=None):
+    """Metrics of the closed trades in a trade log, and with the account value Series from
+    simulate() the full PerformanceMetrics set (exposure, returns, Sharpe, drawdowns, ...)"""
+    profit_loss = trade_log_df['Profit/Loss'].to_numpy(dtype=float)
+    profit_loss = profit_loss[~np.isnan(profit_loss)]
+    if account_value is None:
+        return trade_metrics(profit_loss)
+    dates = account_value.index
+    entry_index = dates.get_indexer(trade_log_df['Date Bought'])
+    exit_index = dates.get_indexer(trade_log_df['Date Sold'])
+    years = (dates[-1] - dates[0]).days / 365.25 if len(dates) else None
+    return performance_metrics(profit_loss, entry_index, exit_index, account_value.to_numpy(dtype=float), years)
+
+def save_results(results_dir, symbol, trade_log_df, performance_metrics, config=None, timestamp_format='%Y%m%d%H%M%S'):
+    """Write trading_log.csv and performance_metrics.json under results_dir/symbol.
+
+    When config is given the results go into a new timestamped subdirectory
+    together with a copy of the configuration used. Returns the directory.
+    """
+    output_dir = os.path.join(results_dir, symbol)
+    if config is not None:
+        output_dir = os.path.join(output_dir, datetime.now().strftime(timestamp_format))
+    os.makedirs(output_dir, exist_ok=True)
+
+    trade_log_df.to_csv(os.path.join(output_dir, 'trading_log.csv'), index=False)
+    with open(os.path.join(output_dir, 'performance_metrics.json'), 'w') as f:
+        json.dump(performance_metrics, f, indent=4)
+    if config is not None:
+        with open(os.path.join(output_dir, 'config.json'), 'w') as f:
+            json.dump(config, f, indent=4)
+    return output_dir
+
+def cached_backtest(df, strategy, version, params, config, compute):
+    """Return compute(df) -> (trade_log_df, performance_metrics), reusing the stored result when
+    the price data, strategy version, parameters and configuration are all unchanged"""
+    settings = {name: value for name, value in config.items() if name != 'API_KEY'}
+    key = result_key(df, strategy, [ENGINE_VERSION, version], params, settings)
+    cached = load_result(key)
+    if cached is not None:
+        return cached
+    trade_log_df, performance_metrics = compute(df)
+    store_result(key, trade_log_df, performance_metrics)
+    return trade_log_df, performance_metrics
@@ -0,0 +1,104 @@
+import importlib.util
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import closing
+import pandas as pd
+from DataCache import load_stocks
+from FMPClient import reset_clients
+from ResultsDB import RESULTS_DB, connect, start_run, record_results
+
+BACKTEST_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'BackTest')
+
+# Backtest module for each strategy found by the scanners, and the consolidated
+# columns that hold its integer parameters (passed to backtest() in this order)
+STRATEGIES = {
+    'EMA Slope Change': ('EMASlopeBacktest', ['signal_length']),
+    'SMA Cross': ('SMACrossBacktest', ['short_signal', 'long_signal']),
+    'Williams Alligator': ('WIlliamsAlligatorBacktest', []),
+    'MACD': ('MACDRSIBacktest', []),
+    'SMA Slope Change': ('SMASlopeBacktest', ['signal_length']),
+    'MACD SMA': ('SMAMACDBacktest', []),
+    'Slope': ('SlopeBacktest', [])
+}
+
+_modules = {}
+
+def load_backtest(module_name):
+    """Import a BackTest script once per process"""
+    if module_name not in _modules:
+        script = os.path.join(BACKTEST_DIR, f'{module_name}.py')
+        spec = importlib.util.spec_from_file_location(module_name, script)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _modules[module_name] = module
+    return _modules[module_name]
+
+def build_jobs(consolidated_df):
+    """Unique (strategy, symbol, params) jobs from the consolidated signals, in first-seen order"""
+    jobs = {}
+    for row in consolidated_df.to_dict('records'):
+        strategy = row['strategy']
+        if strategy not in STRATEGIES:
+            continue
+        _, param_columns = STRATEGIES[strategy]
+        try:
+            params = tuple(int(row[column]) for column in param_columns)
+        except (TypeError, ValueError):
+            print(f"Skipping {strategy} {row['Stock']}: missing parameters")
+            continue
+        jobs[(strategy, row['Stock'], params)] = None
+    return list(jobs)
+
+def prefetch(jobs):
+    """Top up the price cache for every job's symbol once, so the workers read their data from disk"""
+    symbols_by_key = defaultdict(set)
+    for strategy, symbol, _ in jobs:
+        symbols_by_key[load_backtest(STRATEGIES[strategy][0]).API_KEY].add(symbol)
+    for api_key, symbols in symbols_by_key.items():
+        load_stocks(sorted(symbols), api_key)
+
+def run_job(job):
+    """Run one backtest in this process and return its (trade_log_df, performance_metrics)"""
+    strategy, symbol, params = job
+    module = load_backtest(STRATEGIES[strategy][0])
+    return module.backtest(symbol, *params)
+
+def run_jobs(jobs, max_workers=None):
+    """Run backtest jobs on a process pool (one worker per core by default) and gather their results.
+
+    Returns {job: (trade_log_df, performance_metrics)}; failed jobs are reported and left out.
+    """
+    results = {}
+    if max_workers == 1:
+        for job in jobs:
+            try:
+                results[job] = run_job(job)
+            except Exception as e:
+                print(f'Error running {job}: {e}')
+        return results
+
+    with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count(), initializer=reset_clients) as executor:
+        futures = {executor.submit(run_job, job): job for job in jobs}
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                results[job] = future.result()
+            except Exception as e:
+                print(f'Error running {job}: {e}')
+    return results
+
+def run_backtests(consolidated_df, max_workers=None):
+    """Run every unique backtest of the consolidated signals and store them as one run; returns (run_id, metrics DataFrame)"""
+    jobs = build_jobs(consolidated_df)
+    print(f'Running {len(jobs)} unique backtests from {len(consolidated_df)} signals')
+    prefetch(jobs)
+    results = run_jobs(jobs, max_workers)
+    finished = [job for job in jobs if job in results]
+
+    # Store the whole run in the results database in one bulk write
+    with closing(connect()) as conn:
+        run_id = start_run(conn, f'{len(finished)} backtests from {len(consolidated_df)} signals')
+        record_results(conn, run_id, [(*job, *results[job]) for job in finished])
+    print(f'Stored run {run_id} in {RESULTS_DB}')
+    return run_id, pd.DataFrame([results[job][1] for job in finished])
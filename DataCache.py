@@ -0,0 +1,68 @@
+import time
+import pandas as pd
+import PriceStore
+from FMPClient import get_client
+
+# Daily bars are kept in the columnar PriceStore, shared by scanners and backtests
+# Seconds a cache file is trusted without topping it up, so the scan and backtest phases of one run share a download
+CACHE_TTL = 15 * 60
+
+def is_fresh(symbol):
+    modified = PriceStore.last_modified(symbol)
+    return modified is not None and time.time() - modified < CACHE_TTL
+
+def read_cache(symbol):
+    """Memory-map the cached bars for a symbol, or return an empty DataFrame if there are none"""
+    try:
+        return PriceStore.load_frame(symbol)
+    except (OSError, ValueError):
+        print(f'Discarding unreadable cache entry: {PriceStore.symbol_dir(symbol)}')
+        return pd.DataFrame()
+
+def write_cache(symbol, df):
+    PriceStore.write_bars(symbol, df)
+
+def download_historical_data(symbol, api_key, start_date=None):
+    return get_client(api_key).historical_prices(symbol, start_date)
+
+def fetch_historical_data(symbol, api_key, start_date=None, end_date=None):
+    """Return daily bars for a symbol, reading through the on-disk price cache.
+
+    The first call for a symbol downloads its full history. Later calls only
+    request bars from the last cached date onwards (that bar is re-fetched in
+    case it was captured intraday) and merge them into the cache, unless the
+    cache was already checked within the last CACHE_TTL seconds.
+    """
+    cached = read_cache(symbol)
+    if cached.empty:
+        df = download_historical_data(symbol, api_key)
+    elif is_fresh(symbol):
+        df = cached
+    else:
+        last_date = cached.index.max()
+        new_bars = download_historical_data(symbol, api_key, last_date)
+        if new_bars.empty:
+            # Nothing new yet; mark the cache as checked
+            PriceStore.touch(symbol)
+            df = cached
+        else:
+            df = pd.concat([cached[cached.index < new_bars.index.min()], new_bars])
+
+    if df is not cached and not df.empty:
+        write_cache(symbol, df)
+        # Hand back the stored, memory-mapped copy so every caller sees the same columns and dtypes
+        df = read_cache(symbol)
+
+    if not df.empty and (start_date is not None or end_date is not None):
+        start = start_date.strftime('%Y-%m-%d') if start_date is not None else None
+        end = end_date.strftime('%Y-%m-%d') if end_date is not None else None
+        df = df.loc[start:end]
+    # Lets Indicators memoise per-symbol indicators of this frame
+    df.attrs['symbol'] = symbol
+    return df
+
+def load_stocks(stocks, api_key):
+    """Fetch every symbol once, concurrently, and return a dict of symbol -> DataFrame for the ones with data"""
+    client = get_client(api_key)
+    frames = client.map(lambda stock: fetch_historical_data(stock, api_key), list(stocks))
+    return {stock: df for stock, df in frames.items() if not df.empty}
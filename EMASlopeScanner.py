@@ -1,6 +1,6 @@
-import requests
-import pandas as pd
-import numpy as np
+from DataCache import load_stocks
+from PanelIndicators import Panel, signal_rows, ewm_warmup
+from StreamingIndicators import EWM, Shifted, latest_values, streaming_rows
 
 # Constants
 API_KEY = 'api_here'  # Replace with your Financial Modeling Prep API key
@@ -46,53 +46,65 @@ STOCKS = [
 
 EMA_LENGTHS = [10, 20, 50, 100, 200]
 
-def fetch_historical_data(symbol, api_key):
-    url = f'https://financialmodelingprep.com/api/v3/historical-price-full/{symbol}?apikey={api_key}'
-    response = requests.get(url)
-    data = response.json()
-    if 'historical' in data:
-        df = pd.DataFrame(data['historical'])
-        df['date'] = pd.to_datetime(df['date'])
-        df.set_index('date', inplace=True)
-        df.sort_index(inplace=True)
-        return df
-    else:
-        return pd.DataFrame()
+# Bars each scan needs: the longest EMA's warm-up, the 5-bar slope and the previous bar's slope
+LOOKBACK = ewm_warmup(max(EMA_LENGTHS)) + 5 + 1
 
-def calculate_ema(df, ema_length):
-    df[f'EMA_{ema_length}'] = df['close'].ewm(span=ema_length, adjust=False).mean()
-    return df
+def detect_slope_changes(ema, slope_length=5):  # You can adjust the slope length if needed
+    return (ema - ema.shift(slope_length)) / slope_length
 
-def detect_slope_changes(df, ema_length):
-    slope_length = 5  # You can adjust the slope length if needed
-    ema_col = f'EMA_{ema_length}'
-    df['EMA_Slope'] = (df[ema_col] - df[ema_col].shift(slope_length)) / slope_length
-    df['Positive_Slope_Change'] = (df['EMA_Slope'] > 0) & (df['EMA_Slope'].shift(1) <= 0)
-    return df
+def scan_stocks(panel, ema_length):
+    # EMA and slope for every symbol at once, read back at each symbol's latest bar
+    ema = panel.ema(ema_length)
+    slope = detect_slope_changes(ema)
+    recent_slope = panel.latest(slope)
+    positive_slope_change = (recent_slope > 0) & (panel.latest(slope, 1) <= 0)
+    return signal_rows(panel, positive_slope_change, {
+        'Close': panel.latest(panel.close),
+        'EMA_Length': ema_length,
+        'EMA_Value': panel.latest(ema),
+        'EMA_Slope': recent_slope
+    })
 
-def scan_stocks(stocks, ema_length, api_key):
-    results = []
-    for stock in stocks:
-        df = fetch_historical_data(stock, api_key)
-        if not df.empty:
-            df = calculate_ema(df, ema_length)
-            df = detect_slope_changes(df, ema_length)
-            latest_date = df.index.max()
-            positive_slope_changes = df[(df['Positive_Slope_Change']) & (df.index == latest_date)]
-            for date, row in positive_slope_changes.iterrows():
-                results.append({
-                    'Stock': stock,
-                    'Date': date,
-                    'Close': row['close'],
-                    'EMA_Length': ema_length,
-                    'EMA_Value': row[f'EMA_{ema_length}'],
-                    'EMA_Slope': row['EMA_Slope']
-                })
-    return pd.DataFrame(results)
+def run_scan(stock_data):
+    """Scanner plugin entry point used by ScanDriver: returns {output filename: results DataFrame}"""
+    # The panel is built once and shared by every parameter set
+    panel = Panel(stock_data)
+    outputs = {}
+    for ema_length in EMA_LENGTHS:
+        outputs[f'ema_{ema_length}_slope_changes_today.csv'] = scan_stocks(panel, ema_length)
+    return outputs
 
-# Iterate over EMA lengths and save results to files
-for ema_length in EMA_LENGTHS:
-    results = scan_stocks(STOCKS, ema_length, API_KEY)
-    filename = f'ema_{ema_length}_slope_changes_today.csv'
-    results.to_csv(filename, index=False)
-    print(f'Results for EMA {ema_length} saved to {filename}')
+def make_indicators():
+    indicators = {}
+    for ema_length in EMA_LENGTHS:
+        indicators[f'EMA_{ema_length}'] = EWM(ema_length)
+        indicators[f'EMA_{ema_length}_Shifted'] = Shifted(EWM(ema_length), 5)
+    return indicators
+
+def scan_streaming(stock_data, indicators):
+    # The slope of each EMA today and on the previous bar, from each symbol's streamed EMAs
+    outputs = {}
+    for ema_length in EMA_LENGTHS:
+        ema, shifted = f'EMA_{ema_length}', f'EMA_{ema_length}_Shifted'
+        latest = latest_values(stock_data, indicators, lambda symbol: {
+            'EMA_Value': symbol[ema].value,
+            'EMA_Slope': (symbol[ema].value - symbol[shifted].value) / 5,
+            'Previous_Slope': (symbol[ema].previous - symbol[shifted].previous) / 5
+        })
+        positive_slope_change = (latest['EMA_Slope'] > 0) & (latest['Previous_Slope'] <= 0)
+        outputs[f'ema_{ema_length}_slope_changes_today.csv'] = streaming_rows(stock_data, positive_slope_change, {
+            'Close': latest['Close'],
+            'EMA_Length': ema_length,
+            'EMA_Value': latest['EMA_Value'],
+            'EMA_Slope': latest['EMA_Slope']
+        })
+    return outputs
+
+if __name__ == '__main__':
+    # Fetch every symbol once and reuse it for all parameter sets
+    stock_data = load_stocks(STOCKS, API_KEY)
+
+    # Evaluate every parameter set and save results to files
+    for filename, results in run_scan(stock_data).items():
+        results.to_csv(filename, index=False)
+        print(f'Results saved to {filename}')
@@ -0,0 +1,121 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+import pandas as pd
+from requests.adapters import HTTPAdapter
+
+# Defaults for the Financial Modeling Prep API; set REQUESTS_PER_MINUTE to match your API tier
+BASE_URL = 'https://financialmodelingprep.com/api/v3'
+REQUESTS_PER_MINUTE = 300
+MAX_WORKERS = 8
+MAX_RETRIES = 4
+BACKOFF_FACTOR = 0.5
+TIMEOUT = 30
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+class RateLimiter:
+    """Spaces out calls from any number of threads to at most requests_per_minute"""
+
+    def __init__(self, requests_per_minute):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self.lock = threading.Lock()
+        self.next_time = time.monotonic()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            wait_time = self.next_time - now
+            self.next_time = max(now, self.next_time) + self.interval
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+class FMPClient:
+    """Pooled, rate limited HTTP client for the FMP endpoints used by the scanners and backtests.
+
+    All requests go through one requests.Session so keep-alive connections are
+    reused, every attempt (including retries) is counted against the rate
+    limit, and 429/5xx responses or connection errors are retried with
+    exponential backoff. Point base_url at a local server to test it offline.
+    """
+
+    def __init__(self, api_key, base_url=BASE_URL, requests_per_minute=REQUESTS_PER_MINUTE,
+                 max_workers=MAX_WORKERS, max_retries=MAX_RETRIES, backoff_factor=BACKOFF_FACTOR,
+                 timeout=TIMEOUT):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.timeout = timeout
+        self.rate_limiter = RateLimiter(requests_per_minute)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def get_json(self, path, **params):
+        """GET base_url/path and return the decoded JSON, or {} if the request keeps failing"""
+        url = f'{self.base_url}/{path.lstrip("/")}'
+        params['apikey'] = self.api_key
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.wait()
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            else:
+                if response.status_code not in RETRY_STATUS_CODES:
+                    try:
+                        return response.json()
+                    except ValueError:
+                        print(f'Invalid JSON from {path}: {response.text[:200]}')
+                        return {}
+                error = f'HTTP {response.status_code}'
+                retry_after = response.headers.get('Retry-After')
+                if retry_after and retry_after.isdigit() and attempt < self.max_retries:
+                    time.sleep(int(retry_after))
+                    continue
+            if attempt < self.max_retries:
+                time.sleep(self.backoff_factor * (2 ** attempt))
+        print(f'Giving up on {path} after {self.max_retries + 1} attempts: {error}')
+        return {}
+
+    def historical_prices(self, symbol, start_date=None, end_date=None):
+        params = {}
+        if start_date is not None:
+            params['from'] = start_date.strftime('%Y-%m-%d')
+        if end_date is not None:
+            params['to'] = end_date.strftime('%Y-%m-%d')
+        data = self.get_json(f'historical-price-full/{symbol}', **params)
+        if 'historical' in data and data['historical']:
+            df = pd.DataFrame(data['historical'])
+            df['date'] = pd.to_datetime(df['date'])
+            df.set_index('date', inplace=True)
+            df.sort_index(inplace=True)
+            return df
+        else:
+            return pd.DataFrame()
+
+    def map(self, func, symbols):
+        """Call func(symbol) for every symbol on a bounded thread pool and return {symbol: result}"""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return dict(zip(symbols, executor.map(func, symbols)))
+
+    def close(self):
+        self.session.close()
+
+# One shared client per API key so every caller in a process reuses the same connection pool
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_client(api_key, **kwargs):
+    with _clients_lock:
+        if api_key not in _clients:
+            _clients[api_key] = FMPClient(api_key, **kwargs)
+        return _clients[api_key]
+
+def reset_clients():
+    """Forget the shared clients, e.g. in a forked worker that must not reuse its parent's sockets"""
+    with _clients_lock:
+        _clients.clear()
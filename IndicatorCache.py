@@ -0,0 +1,131 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+# Memory budget for cached indicator values; least recently used entries are evicted first
+MAX_BYTES = 256 * 1024 * 1024
+# Also keep every computed indicator in INDICATOR_CACHE_DIR, so backtest worker
+# processes and later runs on the same bars can reuse it
+PERSIST = False
+INDICATOR_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'IndicatorCache')
+# Disk budget of INDICATOR_CACHE_DIR; the least recently used files beyond it are removed
+MAX_DISK_BYTES = 1024 * 1024 * 1024
+
+def indicator_key(symbol, indicator, params, first_date, last_date, bars, close):
+    """Key for an indicator of one symbol computed over `bars` bars from first_date to last_date.
+
+    Rolling values only depend on the last bar date, but EWMs depend on where the
+    history starts, so the first date and the bar count are part of the key too.
+    The dates alone do not identify the values: the newest bar is re-downloaded
+    once a bar captured intraday has closed, and adjusted history changes after
+    a split, so a fingerprint of the closes is included as well.
+    """
+    return (symbol, indicator, tuple(params)) + bar_range(first_date, last_date, bars, close)
+
+def close_fingerprint(close):
+    return hashlib.blake2b(np.ascontiguousarray(close, dtype=float).tobytes(), digest_size=8).hexdigest()
+
+def bar_range(first_date, last_date, bars, close):
+    """The part of an indicator key that identifies the bars; worth precomputing when building many keys"""
+    return (str(pd.Timestamp(first_date)), str(pd.Timestamp(last_date)), int(bars), close_fingerprint(close))
+
+class IndicatorCache:
+    """Thread-safe LRU of indicator arrays keyed by indicator_key(), bounded by total bytes"""
+
+    def __init__(self, max_bytes=MAX_BYTES, cache_dir=None):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.pruned = False
+
+    def entry_path(self, key):
+        return os.path.join(self.cache_dir, hashlib.sha256(repr(key).encode()).hexdigest() + '.npy')
+
+    def get(self, key):
+        """Return the cached array for key, or None on a miss"""
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+        if self.cache_dir is not None:
+            path = self.entry_path(key)
+            try:
+                values = np.load(path)
+                # Mark the file as recently used for prune()
+                os.utime(path)
+            except (OSError, ValueError):
+                values = None
+            if values is not None:
+                self.put(key, values, persist=False)
+                with self.lock:
+                    self.hits += 1
+                return values
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, values, persist=True):
+        values.setflags(write=False)  # Shared between callers, so nobody may modify it
+        with self.lock:
+            if key in self.entries:
+                self.size -= self.entries.pop(key).nbytes
+            if values.nbytes <= self.max_bytes:
+                self.entries[key] = values
+                self.size += values.nbytes
+                while self.size > self.max_bytes:
+                    _, evicted = self.entries.popitem(last=False)
+                    self.size -= evicted.nbytes
+        if persist and self.cache_dir is not None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self.entry_path(key)
+            tmp_path = f'{path}.{os.getpid()}.tmp.npy'
+            np.save(tmp_path, values)
+            os.replace(tmp_path, path)
+            if not self.pruned:
+                self.pruned = True
+                self.prune()
+
+    def prune(self, max_bytes=MAX_DISK_BYTES):
+        """Remove the least recently used files of cache_dir until it fits in max_bytes (once per process)"""
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def get_or_compute(self, key, compute):
+        values = self.get(key)
+        if values is None:
+            values = np.asarray(compute(), dtype=float)
+            self.put(key, values)
+        return values
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+# One cache per process shared by every scanner and backtest
+_cache = IndicatorCache(cache_dir=INDICATOR_CACHE_DIR if PERSIST else None)
+
+def get_cache():
+    return _cache
@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+from IndicatorCache import get_cache, indicator_key, bar_range
+
+def calculate_slope(series, length):
+    """Calculate the rolling linear regression slope of the series over `length` bars.
+
+    Equivalent to fitting np.polyfit(np.arange(length), window, 1) on every
+    window, but done as a single correlation with the centred x offsets. A
+    window containing any NaN, and the first length - 1 bars, give NaN.
+    """
+    if length < 2:
+        raise ValueError('Slope length must be at least 2')
+    y = np.asarray(series, dtype=float)
+    slopes = np.full(len(y), np.nan)
+    if len(y) < length:
+        return slopes
+
+    # slope = sum((x - mean(x)) * y) / sum((x - mean(x)) ** 2) for x = 0..length-1
+    x = np.arange(length) - (length - 1) / 2
+    valid = ~np.isnan(y)
+    numerator = np.correlate(np.where(valid, y, 0.0), x, mode='valid')
+    slope = numerator / np.dot(x, x)
+
+    # Mask windows that are missing any value
+    valid_counts = np.cumsum(np.concatenate(([0], valid)))
+    complete = (valid_counts[length:] - valid_counts[:-length]) == length
+    slopes[length - 1:] = np.where(complete, slope, np.nan)
+    return slopes
+
+def sma_bank(values, windows):
+    """Simple moving averages for several window lengths from one prefix-sum pass.
+
+    values is 1-D, or 2-D with one series per column and time along axis 0.
+    Returns an array of shape (len(windows),) + values.shape whose i-th slice
+    matches rolling(window=windows[i]).mean(): NaN until the first full window
+    and for every window that contains a NaN. Each series is centred on its
+    mean before summing so the prefix sums stay small and window differences
+    keep their precision (agreement with pandas is around 1e-12 relative).
+    """
+    values = np.asarray(values, dtype=float)
+    valid = ~np.isnan(values)
+    counts = valid.sum(axis=0)
+    center = np.where(counts > 0, np.where(valid, values, 0.0).sum(axis=0) / np.maximum(counts, 1), 0.0)
+    zeros = np.zeros((1,) + values.shape[1:])
+    sums = np.concatenate([zeros, np.cumsum(np.where(valid, values - center, 0.0), axis=0)])
+    valid_counts = np.concatenate([zeros, np.cumsum(valid, axis=0)])
+
+    bank = np.full((len(windows),) + values.shape, np.nan)
+    for i, window in enumerate(windows):
+        if window < 1 or window > len(values):
+            continue
+        complete = (valid_counts[window:] - valid_counts[:-window]) == window
+        bank[i, window - 1:] = np.where(complete, (sums[window:] - sums[:-window]) / window + center, np.nan)
+    return bank
+
+# Indicators of one symbol's bars, memoised in the shared IndicatorCache when the
+# frame knows its symbol (df.attrs['symbol'], set by DataCache). They compute the
+# same values as the PanelIndicators functions, so scanners and backtests share entries.
+
+def cached_indicator(df, indicator, params, compute):
+    """compute(close) -> Series, read through the indicator cache"""
+    symbol = df.attrs.get('symbol')
+    if symbol is None or df.empty:
+        return compute(df['close'])
+    key = indicator_key(symbol, indicator, params, df.index[0], df.index[-1], len(df), df['close'].to_numpy())
+    values = get_cache().get_or_compute(key, lambda: compute(df['close']).to_numpy(dtype=float))
+    return pd.Series(values, index=df.index)
+
+def smas(df, windows):
+    """{window: SMA Series} for several windows; the ones not cached yet come from one sma_bank() pass"""
+    windows = list(dict.fromkeys(windows))
+    symbol = df.attrs.get('symbol')
+    cache = get_cache()
+    keys = {}
+    values = {}
+    if symbol is not None and not df.empty:
+        bars = bar_range(df.index[0], df.index[-1], len(df), df['close'].to_numpy())
+        keys = {window: (symbol, 'SMA', (window,)) + bars for window in windows}
+        values = {window: cache.get(key) for window, key in keys.items()}
+    missing = [window for window in windows if values.get(window) is None]
+    if missing:
+        for window, computed in zip(missing, sma_bank(df['close'].to_numpy(dtype=float), missing)):
+            values[window] = computed
+            if window in keys:
+                cache.put(keys[window], computed)
+    return {window: pd.Series(values[window], index=df.index) for window in windows}
+
+def sma(df, window):
+    return smas(df, [window])[window]
+
+def ema(df, span):
+    return cached_indicator(df, 'EMA', [span], lambda close: close.ewm(span=span, adjust=False).mean())
+
+def macd(df, fast=12, slow=26, signal=9):
+    """Return the (MACD, signal line) Series"""
+    macd_line = ema(df, fast) - ema(df, slow)
+    signal_line = cached_indicator(df, 'MACD_Signal', [fast, slow, signal], lambda close: macd_line.ewm(span=signal, adjust=False).mean())
+    return macd_line, signal_line
+
+def rsi(df, period=14):
+    """RSI from simple rolling means of gains and losses"""
+    def compute(close):
+        delta = close.diff(1)
+        gain = delta.where(delta > 0, 0)
+        loss = -delta.where(delta < 0, 0)
+        avg_gain = gain.rolling(window=period, min_periods=1).mean()
+        avg_loss = loss.rolling(window=period, min_periods=1).mean()
+        rs = avg_gain / avg_loss
+        return 100 - (100 / (1 + rs))
+    return cached_indicator(df, 'RSI', [period], compute)
@@ -1,6 +1,6 @@
-import requests
-import pandas as pd
-import numpy as np
+from DataCache import load_stocks
+from PanelIndicators import Panel, signal_rows, macd_warmup
+from StreamingIndicators import MACD, RSI, latest_values, streaming_rows
 
 # Constants
 API_KEY = 'api_here'  # Replace with your Financial Modeling Prep API key
@@ -44,63 +44,47 @@ STOCKS = [
     "XLU"                         # Utilities Select Sector SPDR Fund
 ]
 
-def fetch_historical_data(symbol, api_key):
-    url = f'https://financialmodelingprep.com/api/v3/historical-price-full/{symbol}?apikey={api_key}'
-    response = requests.get(url)
-    data = response.json()
-    if 'historical' in data:
-        df = pd.DataFrame(data['historical'])
-        df['date'] = pd.to_datetime(df['date'])
-        df.set_index('date', inplace=True)
-        df.sort_index(inplace=True)
-        return df
-    else:
-        return pd.DataFrame()
+# Bars each scan needs: the MACD signal line's warm-up plus the previous bar
+LOOKBACK = macd_warmup() + 1
 
-def calculate_macd(df):
-    df['EMA_12'] = df['close'].ewm(span=12, adjust=False).mean()
-    df['EMA_26'] = df['close'].ewm(span=26, adjust=False).mean()
-    df['MACD'] = df['EMA_12'] - df['EMA_26']
-    df['Signal_Line'] = df['MACD'].ewm(span=9, adjust=False).mean()
-    df['MACD_Hist'] = df['MACD'] - df['Signal_Line']
-    return df
+def scan_stocks(stock_data):
+    # Indicators for every symbol at once, read back at each symbol's latest bar
+    panel = Panel(stock_data)
+    macd_line, signal_line, _ = panel.macd()
+    rsi_values = panel.rsi()
+    recent_macd, recent_signal = panel.latest(macd_line), panel.latest(signal_line)
+    macd_buy_signal = (recent_macd > recent_signal) & (panel.latest(macd_line, 1) <= panel.latest(signal_line, 1))
+    #rsi_confirmation = panel.latest(rsi_values) < 30
+    return signal_rows(panel, macd_buy_signal, {  # & rsi_confirmation
+        'Close': panel.latest(panel.close),
+        'MACD': recent_macd,
+        'Signal Line': recent_signal,
+        'RSI': panel.latest(rsi_values)
+    })
 
-def calculate_rsi(df, period=14):
-    delta = df['close'].diff(1)
-    gain = delta.where(delta > 0, 0)
-    loss = -delta.where(delta < 0, 0)
-    avg_gain = gain.rolling(window=period, min_periods=1).mean()
-    avg_loss = loss.rolling(window=period, min_periods=1).mean()
-    rs = avg_gain / avg_loss
-    df['RSI'] = 100 - (100 / (1 + rs))
-    return df
+FILENAME = 'macd_rsi_scanner_results.csv'
 
-def scan_stocks(stocks, api_key):
-    results = []
-    for stock in stocks:
-        df = fetch_historical_data(stock, api_key)
-        if not df.empty:
-            df = calculate_macd(df)
-            df = calculate_rsi(df)
-            latest_date = df.index.max()
-            recent = df.loc[latest_date]
-            macd_buy_signal = recent['MACD'] > recent['Signal_Line'] and df['MACD'].iloc[-2] <= df['Signal_Line'].iloc[-2]
-            #rsi_confirmation = recent['RSI'] < 30
-            if macd_buy_signal: #and rsi_confirmation:
-                results.append({
-                    'Stock': stock,
-                    'Date': latest_date,
-                    'Close': recent['close'],
-                    'MACD': recent['MACD'],
-                    'Signal Line': recent['Signal_Line'],
-                    'RSI': recent['RSI']
-                })
-    return pd.DataFrame(results)
+def run_scan(stock_data):
+    """Scanner plugin entry point used by ScanDriver: returns {output filename: results DataFrame}"""
+    return {FILENAME: scan_stocks(stock_data)}
 
-# Scan stocks
-results = scan_stocks(STOCKS, API_KEY)
+def make_indicators():
+    return {'macd': MACD(), 'rsi': RSI(14)}
 
-# Save results to CSV
-filename = 'macd_rsi_scanner_results.csv'
-results.to_csv(filename, index=False)
-print(f'Results saved to {filename}')
+def scan_streaming(stock_data, indicators):
+    # The MACD crossover of scan_stocks, from each symbol's streamed MACD and RSI
+    latest = latest_values(stock_data, indicators, lambda symbol: {
+        'MACD': symbol['macd'].value,
+        'Signal Line': symbol['macd'].signal_line,
+        'Previous_MACD': symbol['macd'].previous,
+        'Previous_Signal': symbol['macd'].signal.previous,
+        'RSI': symbol['rsi'].value
+    })
+    macd_buy_signal = (latest['MACD'] > latest['Signal Line']) & (latest['Previous_MACD'] <= latest['Previous_Signal'])
+    return {FILENAME: streaming_rows(stock_data, macd_buy_signal, {name: latest[name] for name in ['Close', 'MACD', 'Signal Line', 'RSI']})}
+
+if __name__ == '__main__':
+    # Scan the stocks and save results to a file
+    results = scan_stocks(load_stocks(STOCKS, API_KEY))
+    results.to_csv(FILENAME, index=False)
+    print(f'Results saved to {FILENAME}')
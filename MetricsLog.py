@@ -0,0 +1,89 @@
+import argparse
+import json
+import math
+import os
+import pandas as pd
+
+# Ranked performance metrics written by ScanDriver, one JSON object per line
+METRICS_LOG = 'performance_metrics.jsonl'
+# Strings standing in for infinite metric values, which strict JSON has no number for
+INFINITIES = {'Infinity': math.inf, '-Infinity': -math.inf}
+
+def json_value(value):
+    """A metric value as strict JSON allows it: an infinity (e.g. the Profit Factor of a backtest without
+    losses) becomes "Infinity" or "-Infinity", and NaN, an undefined value, becomes null"""
+    try:
+        if math.isnan(value):
+            return None
+        if math.isinf(value):
+            return 'Infinity' if value > 0 else '-Infinity'
+    except TypeError:
+        pass
+    return value
+
+def encode_metrics(record):
+    """A metrics dict as one line of strict JSON"""
+    return json.dumps({name: json_value(value) for name, value in record.items()}, default=float, allow_nan=False)
+
+def decode_metrics(text):
+    """A metrics dict from encode_metrics() JSON, with the infinities restored"""
+    return {name: INFINITIES.get(value, value) if isinstance(value, str) else value for name, value in json.loads(text).items()}
+
+def append_metrics(path, records):
+    """Append metrics dicts to a JSON Lines file, one compact object per line.
+
+    The batch goes out in a single write to a file opened for appending, so
+    earlier lines are never rewritten and concurrent writers do not interleave.
+    Every line is strict JSON: see json_value() for the non-finite values.
+    """
+    lines = ''.join(encode_metrics(record) + '\n' for record in records)
+    if lines:
+        with open(path, 'a') as f:
+            f.write(lines)
+
+def read_metrics(path, strategy=None, symbol=None, run_id=None):
+    """Lazily yield the metrics dicts of a JSON Lines file, optionally only one strategy title, symbol or run.
+
+    Lines are read one at a time, and a line that cannot match the filters is
+    skipped by a substring test before it is parsed.
+    """
+    filters = {name: value for name, value in (('Strategy Title', strategy), ('Symbol', symbol), ('Run ID', run_id)) if value is not None}
+    needles = [json.dumps({name: value})[1:-1] for name, value in filters.items()]
+    with open(path, 'r') as f:
+        for line in f:
+            if not line.strip() or not all(needle in line for needle in needles):
+                continue
+            record = decode_metrics(line)
+            if all(record.get(name) == value for name, value in filters.items()):
+                yield record
+
+def read_concatenated_json(path):
+    """Yield the objects of a file of concatenated pretty-printed JSON objects (the old performance_metrics.json)"""
+    decoder = json.JSONDecoder()
+    with open(path, 'r') as f:
+        text = f.read()
+    position = 0
+    while True:
+        while position < len(text) and text[position].isspace():
+            position += 1
+        if position == len(text):
+            return
+        record, position = decoder.raw_decode(text, position)
+        yield record
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Read ranked performance metrics from a JSON Lines file')
+    parser.add_argument('path', nargs='?', default=METRICS_LOG, help=f'JSON Lines file (default: {METRICS_LOG})')
+    parser.add_argument('--strategy', default=None, help='Only this strategy title')
+    parser.add_argument('--symbol', default=None, help='Only this symbol')
+    parser.add_argument('--run', type=int, default=None, help='Only this results database run ID')
+    parser.add_argument('--convert', metavar='JSON_FILE', default=None, help='Append the objects of an old concatenated performance_metrics.json to the file first')
+    args = parser.parse_args()
+
+    if args.convert:
+        append_metrics(args.path, read_concatenated_json(args.convert))
+        print(f'Converted {args.convert} to {args.path}')
+    if not os.path.exists(args.path):
+        print(f'No metrics file at {args.path}')
+    else:
+        print(pd.DataFrame(read_metrics(args.path, args.strategy, args.symbol, args.run)))
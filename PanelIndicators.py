@@ -0,0 +1,206 @@
+import numpy as np
+import pandas as pd
+from Indicators import calculate_slope, sma_bank
+from IndicatorCache import get_cache, bar_range
+
+class Panel:
+    """Daily bars for a whole universe of symbols held as 2-D (dates x symbols) arrays.
+
+    Symbols do not all trade on the same days (later listings, halts, funds
+    with their own holidays), so the panel is laid out on the union of every
+    symbol's dates with a mask of which symbol has a bar on which date.
+    Indicators are computed on a bar-aligned frame in which each symbol's bars
+    are packed to the top of its column in date order, padded with NaN below.
+    Every column then holds exactly the series the per-symbol code used, so a
+    single vectorized pandas call gives each symbol the same values it would
+    get on its own DataFrame. latest() reads a symbol's values back by bar and
+    to_dates() maps a bar-aligned frame back onto the date grid.
+    """
+
+    def __init__(self, stock_data):
+        self.stock_data = {stock: df for stock, df in stock_data.items() if not df.empty}
+        self.symbols = pd.Index(list(self.stock_data), name='Stock')
+        indexes = [df.index.values for df in self.stock_data.values()]
+        self.dates = pd.DatetimeIndex(np.unique(np.concatenate(indexes)) if indexes else [], name='date')
+        # Row of each symbol's bars on the date grid
+        self.rows = [self.dates.get_indexer(df.index) for df in self.stock_data.values()]
+        self.mask = np.zeros((len(self.dates), len(self.symbols)), dtype=bool)
+        for j, rows in enumerate(self.rows):
+            self.mask[rows, j] = True
+        # Stable sort moves each symbol's bars to the top of its column without reordering them
+        self.order = np.argsort(~self.mask, axis=0, kind='stable')
+        self.counts = self.mask.sum(axis=0)
+        self.first_dates = pd.Series(self.dates[self.order[0]] if len(self.dates) else self.dates, index=self.symbols)
+        self.bar_ranges = [bar_range(first, last, count, df['close'].to_numpy())
+                           for first, last, count, df in zip(self.first_dates, self.latest_dates(), self.counts, self.stock_data.values())]
+        self.close = self.field('close')
+
+    def field(self, column):
+        """Bar-aligned frame of one price column for every symbol"""
+        values = np.full(self.mask.shape, np.nan)
+        for j, df in enumerate(self.stock_data.values()):
+            values[self.rows[j], j] = df[column].to_numpy(dtype=float)
+        return self.pack(values)
+
+    def pack(self, values):
+        """Bar-aligned frame from a dates x symbols array"""
+        packed = np.take_along_axis(np.asarray(values, dtype=float), self.order, axis=0)
+        packed[np.arange(len(self.dates))[:, None] >= self.counts] = np.nan
+        return pd.DataFrame(packed, columns=self.symbols)
+
+    def to_dates(self, frame):
+        """Dates x symbols frame from a bar-aligned one, NaN where a symbol has no bar"""
+        values = np.full(self.mask.shape, np.nan)
+        np.put_along_axis(values, self.order, frame.to_numpy(dtype=float), axis=0)
+        values[~self.mask] = np.nan
+        return pd.DataFrame(values, index=self.dates, columns=self.symbols)
+
+    def bar_rows(self, offset=0):
+        """Row of each symbol's bar `offset` bars before its latest one (-1 if it has fewer bars)"""
+        rows = self.counts - 1 - offset
+        return np.where(rows >= 0, rows, -1)
+
+    def latest(self, frame, offset=0):
+        """Value of a bar-aligned frame at each symbol's latest bar, or `offset` bars before it"""
+        return pd.Series(self.latest_values(frame, offset), index=self.symbols)
+
+    def latest_values(self, values, offset=0):
+        """Like latest() for an array of shape (..., bars, symbols), e.g. an SMA bank; returns (..., symbols)"""
+        rows = self.bar_rows(offset)
+        latest = np.asarray(values, dtype=float)[..., np.maximum(rows, 0), np.arange(len(self.symbols))]
+        return np.where(rows >= 0, latest, np.nan)
+
+    def latest_dates(self, offset=0):
+        rows = self.bar_rows(offset)
+        dates = self.dates[self.order[np.maximum(rows, 0), np.arange(len(self.symbols))]]
+        return pd.Series(dates.where(rows >= 0), index=self.symbols)
+
+    def bar_number(self, offset=0):
+        """Position of each symbol's latest bar (or `offset` bars before it) in its own history"""
+        return pd.Series(self.bar_rows(offset), index=self.symbols)
+
+    def lookup(self, indicator, params):
+        """Read an indicator from the shared IndicatorCache: (bar-aligned values, per-symbol keys, missing columns)"""
+        cache = get_cache()
+        keys = [(symbol, indicator, tuple(params)) + bars for symbol, bars in zip(self.symbols, self.bar_ranges)]
+        values = np.full(self.mask.shape, np.nan)
+        missing = []
+        for j, key in enumerate(keys):
+            column = cache.get(key)
+            if column is None:
+                missing.append(j)
+            else:
+                values[:len(column), j] = column
+        return values, keys, missing
+
+    def fill(self, values, keys, missing, computed):
+        """Store computed columns (one per missing symbol, in order) in the cache and in values"""
+        cache = get_cache()
+        for i, j in enumerate(missing):
+            column = np.array(computed[:self.counts[j], i], dtype=float)
+            cache.put(keys[j], column)
+            values[:len(column), j] = column
+
+    def indicator(self, indicator, params, compute):
+        """Bar-aligned frame of compute(close), read through the shared IndicatorCache.
+
+        Entries are kept per symbol, so symbols that another scanner or backtest
+        already computed this indicator for are reused, and compute() only runs
+        once, vectorized, over the columns that were missing.
+        """
+        values, keys, missing = self.lookup(indicator, params)
+        if missing:
+            self.fill(values, keys, missing, compute(self.close.iloc[:, missing]).to_numpy(dtype=float))
+        return pd.DataFrame(values, columns=self.symbols)
+
+    def sma_bank(self, windows):
+        """(len(windows), bars, symbols) array of SMAs; whatever is not cached comes from one sma_bank() pass"""
+        lookups = [self.lookup('SMA', [window]) for window in windows]
+        missing = sorted(set().union(*(window_missing for _, _, window_missing in lookups)))
+        if missing:
+            bank = sma_bank(self.close.iloc[:, missing].to_numpy(dtype=float), windows)
+            position = {j: i for i, j in enumerate(missing)}
+            for (values, keys, window_missing), computed in zip(lookups, bank):
+                if window_missing:
+                    self.fill(values, keys, window_missing, computed[:, [position[j] for j in window_missing]])
+        return np.stack([values for values, _, _ in lookups]) if lookups else np.empty((0,) + self.mask.shape)
+
+    def smas(self, windows):
+        """{window: bar-aligned SMA frame} from sma_bank()"""
+        windows = list(dict.fromkeys(windows))
+        return {window: pd.DataFrame(values, columns=self.symbols) for window, values in zip(windows, self.sma_bank(windows))}
+
+    def sma(self, window):
+        return self.smas([window])[window]
+
+    def ema(self, span):
+        return self.indicator('EMA', [span], lambda close: ewm_mean(close, span))
+
+    def macd(self, fast=12, slow=26, signal=9):
+        """Return the (MACD, signal line, histogram) frames"""
+        macd_line = self.ema(fast) - self.ema(slow)
+        signal_line = self.indicator('MACD_Signal', [fast, slow, signal], lambda close: macd(close, fast, slow, signal)[1])
+        return macd_line, signal_line, macd_line - signal_line
+
+    def rsi(self, period=14):
+        return self.indicator('RSI', [period], lambda close: rsi(close, period))
+
+# Relative weight of the bars before a tail window that an EWM may ignore (see ewm_warmup)
+EWM_TOLERANCE = 1e-8
+
+def ewm_warmup(span, tolerance=EWM_TOLERANCE):
+    """Bars after which an adjust=False EWM has forgotten its start to within `tolerance`.
+
+    The weight of everything before the last n bars is (1 - alpha) ** n, so an
+    EWM computed over only the last ewm_warmup(span) bars differs from the
+    full-history value by at most tolerance times the spread of the prices.
+    """
+    alpha = 2.0 / (span + 1)
+    return int(np.ceil(np.log(tolerance) / np.log(1 - alpha)))
+
+def macd_warmup(fast=12, slow=26, signal=9, tolerance=EWM_TOLERANCE):
+    """Bars for the MACD signal line to converge: the MACD line's warm-up, then the signal EWM's"""
+    return max(ewm_warmup(fast, tolerance), ewm_warmup(slow, tolerance)) + ewm_warmup(signal, tolerance)
+
+# Indicators over bar-aligned frames, computed for every symbol in one call.
+# They use the same pandas operations as the per-symbol scanners and backtests.
+
+def rolling_mean(frame, window, min_periods=None):
+    return frame.rolling(window=window, min_periods=min_periods).mean()
+
+def ewm_mean(frame, span):
+    return frame.ewm(span=span, adjust=False).mean()
+
+def macd(frame, fast=12, slow=26, signal=9):
+    """Return the (MACD, signal line, histogram) frames"""
+    macd_line = ewm_mean(frame, fast) - ewm_mean(frame, slow)
+    signal_line = ewm_mean(macd_line, signal)
+    return macd_line, signal_line, macd_line - signal_line
+
+def rsi(frame, period=14):
+    """RSI from simple rolling means of gains and losses, as the scanners compute it"""
+    delta = frame.diff(1)
+    gain = delta.where(delta > 0, 0)
+    loss = -delta.where(delta < 0, 0)
+    avg_gain = gain.rolling(window=period, min_periods=1).mean()
+    avg_loss = loss.rolling(window=period, min_periods=1).mean()
+    rs = avg_gain / avg_loss
+    return 100 - (100 / (1 + rs))
+
+def rolling_slope(frame, length):
+    """Rolling regression slope of every column (see Indicators.calculate_slope)"""
+    return frame.apply(lambda column: pd.Series(calculate_slope(column, length), index=column.index))
+
+def signal_rows(panel, hits, columns):
+    """Scanner results for the symbols where hits is True: Stock, Date, then the given columns.
+
+    columns maps each output column to a per-symbol Series or a constant.
+    Returns an empty DataFrame when nothing matched, like the per-symbol scanners.
+    """
+    hits = hits.to_numpy(dtype=bool)
+    if not hits.any():
+        return pd.DataFrame()
+    rows = {'Stock': panel.symbols[hits], 'Date': panel.latest_dates()[hits].to_numpy()}
+    for name, values in columns.items():
+        rows[name] = values[hits].to_numpy() if isinstance(values, pd.Series) else values
+    return pd.DataFrame(rows)
@@ -0,0 +1,199 @@
+import argparse
+import itertools
+import json
+import math
+import os
+import random
+import pandas as pd
+from BacktestEngine import ENGINE_VERSION, load_price_history, simulate, stop_settings, compute_performance_metrics
+from BacktestRunner import STRATEGIES, load_backtest
+from Indicators import smas
+from ResultCache import result_key
+
+# Default grid (generate_signals keyword -> values), validity check and SMA length parameters of the strategies usually swept
+SWEEPS = {
+    'SMA Cross': {
+        'grid': {'short_sma_length': range(5, 55, 5), 'long_sma_length': range(20, 210, 10)},
+        'valid': lambda params: params['short_sma_length'] < params['long_sma_length'],
+        'sma_params': ['short_sma_length', 'long_sma_length']
+    },
+    'Williams Alligator': {
+        'grid': {
+            'jaw_length': [10, 13, 16, 21], 'jaw_shift': [5, 8],
+            'teeth_length': [6, 8, 10], 'teeth_shift': [3, 5],
+            'lips_length': [3, 5], 'lips_shift': [2, 3]
+        },
+        'valid': lambda params: params['lips_length'] < params['teeth_length'] < params['jaw_length'],
+        'sma_params': ['jaw_length', 'teeth_length', 'lips_length']
+    },
+    'EMA Slope Change': {
+        'grid': {'ema_length': [5, 10, 20, 30, 50, 100, 150, 200], 'slope_length': [3, 5, 8, 13, 21]},
+        'valid': None,
+        'sma_params': []
+    }
+}
+SORT_BY = 'Total Profit/Loss'
+
+# Successive halving: candidates drawn from the grid, history of the first rung
+# in years, and the fraction (1 / ETA) of candidates promoted to the next rung
+SAMPLES = 81
+MIN_YEARS = 1
+ETA = 3
+
+def parameter_grid(grid, valid=None):
+    """Every combination of the grid's values as a list of keyword dicts, keeping those valid() accepts"""
+    names = list(grid)
+    combinations = [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+    return [params for params in combinations if valid is None or valid(params)]
+
+def load_strategy(strategy, symbol):
+    """The strategy's BackTest module and the symbol's full backtest history"""
+    module = load_backtest(STRATEGIES[strategy][0])
+    return module, load_price_history(symbol, module.API_KEY, module.YEARS_TO_LOOK_BACK)
+
+def prime_smas(strategy, df, combinations):
+    """Compute every SMA length used by the combinations in one prefix-sum pass, so generate_signals finds them cached"""
+    names = SWEEPS.get(strategy, {}).get('sma_params', [])
+    smas(df, sorted({params[name] for params in combinations for name in names if name in params}))
+
+def evaluate(module, df, params):
+    signals = module.generate_signals(df.copy(), **params)
+    trade_log_df, account_value = simulate(signals, module.INITIAL_CASH, module.PERCENT_TO_INVEST, **stop_settings(module.config))
+    return compute_performance_metrics(trade_log_df, account_value)
+
+def rank(symbol, results, sort_by=SORT_BY):
+    """Table of [(params, metrics)] with one row per combination, best first by sort_by"""
+    results = pd.DataFrame([{'Symbol': symbol, **params, **metrics} for params, metrics in results])
+    return results.sort_values(sort_by, ascending=False, kind='stable').reset_index(drop=True)
+
+def sweep(strategy, symbol, combinations, sort_by=SORT_BY):
+    """Backtest every parameter combination on one load of the symbol's history.
+
+    All SMA lengths in the grid are computed up front in one prefix-sum pass,
+    and every other indicator is shared through the indicator cache, so each
+    combination only pays for its signals and the trade simulation. Returns one
+    row per combination with its parameters and performance metrics, best
+    first by sort_by.
+    """
+    module, df = load_strategy(strategy, symbol)
+    if df.empty:
+        print(f'No price data for {symbol}')
+        return pd.DataFrame()
+    prime_smas(strategy, df, combinations)
+    return rank(symbol, [(params, evaluate(module, df, params)) for params in combinations], sort_by)
+
+def rung_years(full_years, min_years=MIN_YEARS, eta=ETA):
+    """History in years for each successive halving rung, ending with the full window"""
+    years = []
+    while min_years < full_years:
+        years.append(min_years)
+        min_years *= eta
+    return years + [full_years]
+
+def search_key(module, strategy, df, min_years, eta):
+    """Fingerprint of everything a search's metrics depend on: the price data, the engine and strategy
+    versions, the BackTest configuration (stops, cash, sizing) and the rung settings, as cached_backtest() keys results"""
+    settings = {name: value for name, value in module.config.items() if name != 'API_KEY'}
+    return result_key(df, strategy, [ENGINE_VERSION, module.STRATEGY_VERSION], {'min_years': min_years, 'eta': eta}, settings)
+
+def load_checkpoint(path, key):
+    """{years: {params key: metrics}} saved by an earlier search with the same search_key()"""
+    try:
+        with open(path, 'r') as f:
+            checkpoint = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+    if checkpoint.get('key') != key:
+        return {}
+    return checkpoint['rungs']
+
+def save_checkpoint(path, key, last_date, rungs):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'key': key, 'last_date': str(last_date), 'rungs': rungs}, f)
+    os.replace(tmp_path, path)
+
+def successive_halving(strategy, symbol, combinations, samples=SAMPLES, min_years=MIN_YEARS, eta=ETA, sort_by=SORT_BY, seed=0, checkpoint_path=None):
+    """Search the combinations for the best parameters without backtesting all of them on the full history.
+
+    Up to `samples` combinations are drawn at random and backtested on the
+    last min_years of history; the best 1/eta by sort_by are promoted to eta
+    times as much history, and so on until the survivors are backtested on the
+    full YEARS_TO_LOOK_BACK window. That costs about samples * (1 + 1/eta +
+    1/eta^2 + ...) backtests, mostly on short histories. Every result is
+    written to checkpoint_path as it is computed, so an interrupted search
+    picks up where it stopped; the checkpoint is discarded once new bars
+    arrive or the configuration, engine or strategy version or rung settings change. Returns the final rung ranked like sweep().
+    """
+    module, df = load_strategy(strategy, symbol)
+    if df.empty:
+        print(f'No price data for {symbol}')
+        return pd.DataFrame()
+    last_date = df.index[-1]
+    search = search_key(module, strategy, df, min_years, eta)
+    rungs = load_checkpoint(checkpoint_path, search) if checkpoint_path else {}
+
+    candidates = combinations if len(combinations) <= samples else random.Random(seed).sample(combinations, samples)
+    years = rung_years(module.YEARS_TO_LOOK_BACK, min_years, eta)
+    for i, rung in enumerate(years):
+        window = df if i == len(years) - 1 else df[df.index > last_date - pd.Timedelta(days=rung * 365)]
+        done = rungs.setdefault(str(rung), {})
+        prime_smas(strategy, window, [params for params in candidates if json.dumps(params, sort_keys=True) not in done])
+        results = []
+        for params in candidates:
+            key = json.dumps(params, sort_keys=True)
+            if key not in done:
+                done[key] = evaluate(module, window, params)
+                if checkpoint_path:
+                    save_checkpoint(checkpoint_path, search, last_date, rungs)
+            results.append((params, done[key]))
+        ranked = rank(symbol, results, sort_by)
+        print(f'{rung} year(s): {len(candidates)} candidates, best {sort_by} {ranked[sort_by].iloc[0]}')
+        if i < len(years) - 1:
+            # Same stable order as rank(), as positions into results
+            order = pd.Series([metrics[sort_by] for _, metrics in results]).sort_values(ascending=False, kind='stable').index
+            candidates = [results[j][0] for j in order[:max(1, math.ceil(len(candidates) / eta))]]
+    return ranked
+
+def parse_values(text):
+    """'5:50:5' -> range(5, 50, 5), '3,5,8' -> [3, 5, 8]"""
+    if ':' in text:
+        return range(*(int(part) for part in text.split(':')))
+    return [int(part) for part in text.split(',')]
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Backtest a grid of strategy parameters on one symbol and rank them')
+    parser.add_argument('strategy', choices=sorted(STRATEGIES), help='Strategy to sweep')
+    parser.add_argument('symbol', type=str, help='Stock symbol to backtest')
+    parser.add_argument('--param', action='append', default=[], metavar='NAME=VALUES',
+                        help="generate_signals parameter and its values as start:stop:step or v1,v2,... (repeatable; replaces the default grid)")
+    parser.add_argument('--sort-by', default=SORT_BY, help=f'Metric to rank by (default: {SORT_BY})')
+    parser.add_argument('--top', type=int, default=10, help='Rows to print')
+    parser.add_argument('--halving', action='store_true', help='Successive halving search instead of backtesting the whole grid on the full history')
+    parser.add_argument('--samples', type=int, default=SAMPLES, help=f'Combinations drawn from the grid for --halving (default: {SAMPLES})')
+    parser.add_argument('--min-years', type=float, default=MIN_YEARS, help=f'History of the first --halving rung in years (default: {MIN_YEARS})')
+    parser.add_argument('--eta', type=int, default=ETA, help=f'Keep the best 1/ETA of each --halving rung (default: {ETA})')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for drawing --halving samples')
+    args = parser.parse_args()
+
+    defaults = SWEEPS.get(args.strategy, {'grid': {}, 'valid': None})
+    grid = dict(param.split('=', 1) for param in args.param)
+    grid = {name: parse_values(values) for name, values in grid.items()} if grid else defaults['grid']
+    combinations = parameter_grid(grid, defaults['valid'] if not args.param else None)
+
+    module = load_backtest(STRATEGIES[args.strategy][0])
+    output_dir = os.path.join(module.RESULTS_DIR, args.symbol)
+    if args.halving:
+        print(f'Searching {min(len(combinations), args.samples)} of {len(combinations)} parameter combinations of {args.strategy} on {args.symbol}')
+        results = successive_halving(args.strategy, args.symbol, combinations, args.samples, args.min_years, args.eta, args.sort_by, args.seed,
+                                     checkpoint_path=os.path.join(output_dir, 'parameter_search.json'))
+        output_path = os.path.join(output_dir, 'parameter_search.csv')
+    else:
+        print(f'Sweeping {len(combinations)} parameter combinations of {args.strategy} on {args.symbol}')
+        results = sweep(args.strategy, args.symbol, combinations, args.sort_by)
+        output_path = os.path.join(output_dir, 'parameter_sweep.csv')
+    os.makedirs(output_dir, exist_ok=True)
+    results.to_csv(output_path, index=False)
+    print(results.head(args.top))
+    print(f'Results saved to {output_path}')
@@ -0,0 +1,86 @@
+import numpy as np
+
+# Bars per year used to annualize daily returns, and the annual risk-free rate for Sharpe/Sortino
+TRADING_DAYS = 252
+RISK_FREE_RATE = 0.0
+
+def trade_metrics(profit_loss):
+    """Performance metrics from an array of closed trade profits and losses"""
+    total_trades = len(profit_loss)
+    winners = profit_loss > 0
+    profitable_trades = int(winners.sum())
+    percent_profitable = (profitable_trades / total_trades) * 100 if total_trades > 0 else 0
+
+    gross_profit = profit_loss[winners].sum()
+    gross_loss = profit_loss[~winners].sum()
+    profit_factor = (gross_profit / abs(gross_loss)) if gross_loss != 0 else float('inf')
+
+    return {
+        'Total Trades': total_trades,
+        'Percent Profitable': percent_profitable,
+        'Profit Factor': profit_factor,
+        'Total Profit/Loss': profit_loss.sum()
+    }
+
+def win_loss_ratio(profit_loss):
+    """Average winning trade over the average losing trade (NaN without both)"""
+    winners = profit_loss > 0
+    losers = profit_loss < 0
+    if not winners.any() or not losers.any():
+        return float('nan')
+    return profit_loss[winners].mean() / -profit_loss[losers].mean()
+
+def exposure(entry_index, exit_index, bars):
+    """Percentage of the bar-to-bar returns during which a position was held, from the entry and exit bars of each trade (exit -1 while open)"""
+    if bars < 2:
+        return 0.0
+    held = np.where(exit_index >= 0, exit_index, bars - 1) - entry_index
+    return held.sum() / (bars - 1) * 100
+
+EQUITY_METRICS = ['Total Return (%)', 'CAGR (%)', 'Volatility (%)', 'Sharpe Ratio', 'Sortino Ratio', 'Max Drawdown (%)', 'Max Drawdown Duration']
+
+def equity_metrics(account_value, years=None, periods_per_year=TRADING_DAYS, risk_free_rate=RISK_FREE_RATE):
+    """Return and risk metrics of bar-level account values, in one set of array operations.
+
+    account_value may be one curve or a (..., bars) array of curves, e.g. one
+    per parameter combination, in which case every metric is an array over
+    the leading axes. years is the span of the curve (default: its number
+    of returns / periods_per_year) and sets the CAGR. Drawdowns are measured from the
+    running peak, and the drawdown duration is the longest run of bars below
+    a previous peak. Curves shorter than three bars give NaN.
+    """
+    equity = np.asarray(account_value, dtype=float)
+    bars = equity.shape[-1]
+    if bars < 3:
+        return {name: np.full(equity.shape[:-1], np.nan) for name in EQUITY_METRICS}
+    years = (bars - 1) / periods_per_year if years is None else years
+    returns = equity[..., 1:] / equity[..., :-1] - 1
+    excess = returns - risk_free_rate / periods_per_year
+    growth = equity[..., -1] / equity[..., 0]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        volatility = returns.std(axis=-1, ddof=1)
+        downside = np.sqrt((np.minimum(excess, 0) ** 2).mean(axis=-1))
+        mean_excess = excess.mean(axis=-1)
+        sharpe = np.where(volatility > 0, mean_excess / volatility * np.sqrt(periods_per_year), np.nan)
+        sortino = np.where(downside > 0, mean_excess / downside * np.sqrt(periods_per_year), np.nan)
+        cagr = growth ** (1 / years) - 1 if years > 0 else np.full(equity.shape[:-1], np.nan)
+
+    peak = np.maximum.accumulate(equity, axis=-1)
+    drawdown = 1 - equity / peak
+    position = np.arange(bars)
+    last_peak = np.maximum.accumulate(np.where(equity >= peak, position, 0), axis=-1)
+
+    values = [(growth - 1) * 100, cagr * 100, volatility * np.sqrt(periods_per_year) * 100, sharpe, sortino,
+              drawdown.max(axis=-1) * 100, (position - last_peak).max(axis=-1)]
+    return dict(zip(EQUITY_METRICS, values))
+
+def performance_metrics(profit_loss, entry_index, exit_index, account_value, years=None):
+    """The full metric set of one backtest: trade metrics of the closed trades, their win/loss ratio,
+    the market exposure of all trades and the equity curve metrics"""
+    return {
+        **trade_metrics(profit_loss),
+        'Win/Loss Ratio': win_loss_ratio(profit_loss),
+        'Exposure (%)': exposure(entry_index, exit_index, len(account_value)),
+        **{name: value.item() for name, value in equity_metrics(account_value, years).items()}
+    }
@@ -0,0 +1,187 @@
+import argparse
+import heapq
+import json
+import os
+import numpy as np
+import pandas as pd
+from BacktestEngine import load_price_history, position_changes, stop_exit, stop_settings, compute_performance_metrics
+from BacktestRunner import BACKTEST_DIR, STRATEGIES, build_jobs, prefetch, load_backtest
+from TradeLedger import TradeLedger, SIGNAL, STOP
+from PerformanceMetrics import equity_metrics
+
+# Most positions held at once; on a busy day entries are taken in consolidated order until it is reached
+MAX_POSITIONS = 10
+
+def load_config():
+    """The INITIAL_CASH / PERCENT_TO_INVEST / stop configuration shared by the BackTest scripts"""
+    with open(os.path.join(BACKTEST_DIR, 'config.json'), 'r') as f:
+        return json.load(f)
+
+def signal_panel(jobs):
+    """Prices, entry bars and exit bars of every (strategy, symbol, params) job on the union of their dates.
+
+    Signals come from each strategy's generate_signals over the symbol's own
+    bars, and the entry/exit bars follow the single-symbol simulate() rules.
+    Returns (jobs with data, dates, close, entering, exiting, open_, high, low),
+    with the arrays laid out dates x jobs and prices NaN where a symbol has no
+    bar. Like simulate(), open/high/low fall back to the close when missing.
+    """
+    frames = {}
+    for job in jobs:
+        strategy, symbol, params = job
+        module = load_backtest(STRATEGIES[strategy][0])
+        df = load_price_history(symbol, module.API_KEY, module.YEARS_TO_LOOK_BACK)
+        if df.empty:
+            print(f'No price data for {symbol}')
+            continue
+        frames[job] = module.generate_signals(df.copy(), *params)
+
+    indexes = [df.index.values for df in frames.values()]
+    dates = pd.DatetimeIndex(np.unique(np.concatenate(indexes)) if indexes else [], name='date')
+    close = np.full((len(dates), len(frames)), np.nan)
+    open_, high, low = np.full(close.shape, np.nan), np.full(close.shape, np.nan), np.full(close.shape, np.nan)
+    entering = np.zeros(close.shape, dtype=bool)
+    exiting = np.zeros(close.shape, dtype=bool)
+    for k, df in enumerate(frames.values()):
+        rows = dates.get_indexer(df.index)
+        close[rows, k] = df['close'].to_numpy(dtype=float)
+        for panel, column in ((open_, 'open'), (high, 'high'), (low, 'low')):
+            panel[rows, k] = df[column if column in df else 'close'].to_numpy(dtype=float)
+        entering[rows, k], exiting[rows, k] = position_changes(df['Signal'].to_numpy(dtype=float))
+    return list(frames), dates, close, entering, exiting, open_, high, low
+
+def job_stop(k, i, close, exiting, open_, high, low, stop_loss, trailing_stop):
+    """(row, fill price) where job k's position opened on row i is stopped out before or on its next sell bar, or None"""
+    later_exits = np.flatnonzero(exiting[i + 1:, k])
+    end = i + 2 + later_exits[0] if len(later_exits) else len(close)
+    # Only the symbol's own bars, so dates it did not trade on do not break the trailing high
+    rows = i + 1 + np.flatnonzero(~np.isnan(close[i + 1:end, k]))
+    bar, price = stop_exit(close[i, k], open_[rows, k], high[rows, k], low[rows, k], stop_loss, trailing_stop)
+    return None if bar is None else (rows[bar], price)
+
+def simulate_portfolio(dates, close, entering, exiting, initial_cash, percent_to_invest, max_positions=MAX_POSITIONS,
+                       stop_loss=None, trailing_stop=None, open_=None, high=None, low=None):
+    """Trade every job's signals out of one account in a single pass over the dates.
+
+    Only dates with an entry or exit change the account, so only those are
+    visited. On each one, positions whose signal turns to sell are closed
+    first. Then each job turning long opens a position of percent_to_invest of
+    the account value, as of the previous date's closes, in whole shares. A
+    position is skipped when max_positions are already open or the cash does
+    not cover it. A job already holding a position keeps it until its sell
+    signal. Returns the trade log (one row per position, with the job column
+    index in 'Job') and the account value Series.
+
+    stop_loss and trailing_stop work as in simulate(), from the open/high/low
+    panels: a position is closed on the first of its symbol's bars that
+    reaches a stop, before anything fills at that date's closes.
+    """
+    # Latest close on or before each date, to value open positions
+    last_close = pd.DataFrame(close).ffill().to_numpy()
+    shares = np.zeros(close.shape[1])
+    open_trade = np.full(close.shape[1], -1)
+    ledger = TradeLedger()
+    trade_jobs = []
+    cash = float(initial_cash)
+    open_positions = 0
+    event_rows, event_cash = [], []
+    stops = bool(stop_loss) or bool(trailing_stop)
+    # (row, job, fill price) of the stops that close open positions before their next sell bar
+    pending_stops = []
+    for i in [*np.flatnonzero(entering.any(axis=1) | exiting.any(axis=1)), len(dates)]:
+        while pending_stops and pending_stops[0][0] <= i:
+            row = pending_stops[0][0]
+            while pending_stops and pending_stops[0][0] == row:
+                _, k, price = heapq.heappop(pending_stops)
+                cash += shares[k] * price
+                ledger.close(open_trade[k], row, price, STOP)
+                shares[k] = 0.0
+                open_positions -= 1
+            if row < i:
+                event_rows.append(row)
+                event_cash.append(cash)
+        if i == len(dates):
+            break
+
+        for k in np.flatnonzero(exiting[i] & (shares > 0)):
+            cash += shares[k] * close[i, k]
+            ledger.close(open_trade[k], i, close[i, k], SIGNAL)
+            shares[k] = 0.0
+            open_positions -= 1
+
+        candidates = np.flatnonzero(entering[i] & (shares == 0))
+        if len(candidates) and open_positions < max_positions:
+            held = np.flatnonzero(shares)
+            account_value = cash + (shares[held] * last_close[i - 1, held]).sum()
+            for k in candidates:
+                if open_positions >= max_positions:
+                    break
+                price = close[i, k]
+                quantity = min(account_value * percent_to_invest, cash) // price
+                if quantity <= 0:
+                    continue
+                cash -= quantity * price
+                shares[k] = quantity
+                open_trade[k] = ledger.open(i, price, quantity)
+                trade_jobs.append(k)
+                open_positions += 1
+                if stops:
+                    stop = job_stop(k, i, close, exiting, open_, high, low, stop_loss, trailing_stop)
+                    if stop is not None:
+                        heapq.heappush(pending_stops, (stop[0], k, stop[1]))
+        event_rows.append(i)
+        event_cash.append(cash)
+
+    # Forward fill cash and holdings from the trades to every date
+    job = np.array(trade_jobs, dtype=np.int64)
+    closed = ledger.closed
+    holdings = np.zeros(close.shape)
+    np.add.at(holdings, (ledger.entry_index, job), ledger.quantity)
+    np.add.at(holdings, (ledger.exit_index[closed], job[closed]), -ledger.quantity[closed])
+    holdings = np.cumsum(holdings, axis=0)
+    last_event = np.searchsorted(np.array(event_rows, dtype=np.int64), np.arange(len(dates)), side='right') - 1
+    has_event = last_event >= 0
+    cash_curve = np.full(len(dates), float(initial_cash))
+    cash_curve[has_event] = np.array(event_cash)[last_event[has_event]]
+    account_value = pd.Series(cash_curve + np.nansum(holdings * last_close, axis=1), index=dates, name='Account Value')
+
+    trade_log_df = ledger.trade_log(dates)
+    trade_log_df.insert(0, 'Job', job)
+    return trade_log_df, account_value
+
+def run_portfolio(consolidated_df, max_positions=MAX_POSITIONS):
+    """Backtest the consolidated signals as one book: returns (trade log, account value, performance metrics)"""
+    config = load_config()
+    jobs = build_jobs(consolidated_df)
+    prefetch(jobs)
+    jobs, dates, close, entering, exiting, open_, high, low = signal_panel(jobs)
+    print(f'Simulating {len(jobs)} strategy/symbol positions over {len(dates)} dates')
+    trade_log_df, account_value = simulate_portfolio(dates, close, entering, exiting, config['INITIAL_CASH'], config['PERCENT_TO_INVEST'], max_positions,
+                                                     open_=open_, high=high, low=low, **stop_settings(config))
+
+    job_info = pd.DataFrame([{'Strategy': strategy, 'Symbol': symbol, 'Parameters': ' '.join(map(str, params))} for strategy, symbol, params in jobs])
+    trade_log_df = pd.concat([job_info.iloc[trade_log_df['Job']].reset_index(drop=True), trade_log_df.drop(columns='Job')], axis=1) if len(job_info) else trade_log_df.drop(columns='Job')
+
+    performance_metrics = {
+        'Strategy Title': 'Portfolio',
+        'Positions': len(jobs),
+        'Max Positions': max_positions,
+        **compute_performance_metrics(trade_log_df),
+        'Final Account Value': float(account_value.iloc[-1]) if len(account_value) else float(config['INITIAL_CASH']),
+        **{name: value.item() for name, value in equity_metrics(account_value.to_numpy()).items()}
+    }
+    return trade_log_df, account_value, performance_metrics
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Backtest every consolidated signal as one portfolio with shared capital')
+    parser.add_argument('signals', nargs='?', default='consolidated_trades.csv', help='Consolidated signals CSV (default: consolidated_trades.csv)')
+    parser.add_argument('--max-positions', type=int, default=MAX_POSITIONS, help=f'Most positions open at once (default: {MAX_POSITIONS})')
+    args = parser.parse_args()
+
+    trade_log_df, account_value, performance_metrics = run_portfolio(pd.read_csv(args.signals), args.max_positions)
+    trade_log_df.to_csv('portfolio_trading_log.csv', index=False)
+    account_value.to_csv('portfolio_account_value.csv')
+    with open('portfolio_metrics.json', 'w') as f:
+        json.dump(performance_metrics, f, indent=4)
+    print(performance_metrics)
+    print(trade_log_df.head())
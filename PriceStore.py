@@ -0,0 +1,125 @@
+import glob
+import os
+import shutil
+import time
+import uuid
+import numpy as np
+import pandas as pd
+
+# Columnar store of daily bars: one directory per symbol holding versioned
+# subdirectories of date.npy (datetime64[ns], ascending) and one .npy array per
+# numeric column, plus a CURRENT file naming the version to read. Arrays are
+# opened with mmap_mode='r', so loading is a few syscalls per column and
+# columns a reader never touches are never paged in.
+STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'PriceCache')
+DATE_FILE = 'date.npy'
+POINTER_FILE = 'CURRENT'
+# Superseded versions (and abandoned .tmp directories) older than this are removed by the next write
+STALE_SECONDS = 10 * 60
+
+def symbol_dir(symbol, store_dir=None):
+    return os.path.join(store_dir or STORE_DIR, symbol)
+
+def current_dir(symbol, store_dir=None):
+    """Directory of the symbol's current version of bars, or None if it is not stored"""
+    path = symbol_dir(symbol, store_dir)
+    try:
+        with open(os.path.join(path, POINTER_FILE), 'r') as f:
+            return os.path.join(path, f.read().strip())
+    except FileNotFoundError:
+        # Stores written before versioning keep the arrays in the symbol directory itself
+        return path if os.path.exists(os.path.join(path, DATE_FILE)) else None
+
+def stamp_file(symbol, store_dir=None):
+    """File whose modification time records when the symbol's bars were last written or checked"""
+    path = symbol_dir(symbol, store_dir)
+    pointer = os.path.join(path, POINTER_FILE)
+    return pointer if os.path.exists(pointer) else os.path.join(path, DATE_FILE)
+
+def has_symbol(symbol, store_dir=None):
+    return current_dir(symbol, store_dir) is not None
+
+def last_modified(symbol, store_dir=None):
+    """Modification time of a symbol's bars, or None if it is not stored"""
+    try:
+        return os.path.getmtime(stamp_file(symbol, store_dir))
+    except FileNotFoundError:
+        return None
+
+def touch(symbol, store_dir=None):
+    os.utime(stamp_file(symbol, store_dir))
+
+def list_columns(symbol, store_dir=None, path=None):
+    files = glob.glob(os.path.join(path or current_dir(symbol, store_dir), '*.npy'))
+    return sorted(os.path.splitext(os.path.basename(file))[0] for file in files if not file.endswith(DATE_FILE))
+
+def remove_stale_versions(path, current):
+    """Delete the versions and temporary files of a symbol directory that are not current and older than STALE_SECONDS.
+
+    Recent ones are kept, since a reader may have read the old pointer just
+    before it was replaced, or another writer may be about to point to them.
+    """
+    cutoff = time.time() - STALE_SECONDS
+    for name in os.listdir(path):
+        entry = os.path.join(path, name)
+        if name in (current, POINTER_FILE):
+            continue
+        try:
+            if os.path.getmtime(entry) >= cutoff:
+                continue
+            if os.path.isdir(entry):
+                shutil.rmtree(entry, ignore_errors=True)
+            else:
+                # Temporary pointer files and arrays of the pre-versioning layout
+                os.remove(entry)
+        except FileNotFoundError:
+            pass
+
+def write_bars(symbol, df, store_dir=None):
+    """Store the numeric columns of a date-indexed DataFrame, replacing what was stored before.
+
+    The arrays go into a new version directory and the CURRENT pointer is
+    then replaced with os.replace, so readers see either the old or the new
+    bars in full and concurrent writers of the same symbol both succeed.
+    """
+    path = symbol_dir(symbol, store_dir)
+    version = f'{time.time_ns():020d}-{os.getpid()}-{uuid.uuid4().hex[:8]}'
+    tmp_path = os.path.join(path, f'{version}.tmp')
+    os.makedirs(tmp_path)
+    df = df.sort_index()
+    np.save(os.path.join(tmp_path, DATE_FILE), df.index.values.astype('datetime64[ns]'))
+    for column in df.columns:
+        if pd.api.types.is_numeric_dtype(df[column]) and not pd.api.types.is_bool_dtype(df[column]):
+            np.save(os.path.join(tmp_path, f'{column}.npy'), df[column].to_numpy())
+    os.rename(tmp_path, os.path.join(path, version))
+
+    # Switch readers to the new version; those that already mapped the old files keep working
+    pointer_tmp = os.path.join(path, f'{POINTER_FILE}.{version}.tmp')
+    with open(pointer_tmp, 'w') as f:
+        f.write(version)
+    os.replace(pointer_tmp, os.path.join(path, POINTER_FILE))
+    remove_stale_versions(path, version)
+
+def load_columns(symbol, columns=None, store_dir=None):
+    """Return (dates, {column: read-only memory-mapped array}) for a stored symbol"""
+    for attempt in range(3):
+        path = current_dir(symbol, store_dir)
+        if path is None:
+            raise FileNotFoundError(f'No stored bars for {symbol}')
+        try:
+            dates = np.load(os.path.join(path, DATE_FILE), mmap_mode='r')
+            names = list_columns(symbol, path=path) if columns is None else columns
+            arrays = {column: np.load(os.path.join(path, f'{column}.npy'), mmap_mode='r') for column in names}
+            return dates, arrays
+        except FileNotFoundError:
+            # The version was replaced and removed while it was being opened; follow the new pointer
+            if attempt == 2:
+                raise
+
+def load_frame(symbol, columns=None, store_dir=None):
+    """Date-indexed DataFrame whose columns are views of the memory-mapped arrays (no copy, no parsing)"""
+    if not has_symbol(symbol, store_dir):
+        return pd.DataFrame()
+    dates, arrays = load_columns(symbol, columns, store_dir)
+    index = pd.DatetimeIndex(dates, name='date')
+    return pd.DataFrame(arrays, index=index, copy=False)
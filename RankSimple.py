@@ -0,0 +1,131 @@
+import argparse
+import heapq
+import math
+from contextlib import closing
+import pandas as pd
+from ResultsDB import connect, query_metrics, load_rank_stats, save_rank_stats
+
+# Weight of each metric in the score; a negative weight ranks lower values higher (e.g. drawdowns)
+WEIGHTS = {
+    'Percent Profitable': 1.0,
+    'Profit Factor': 1.0,
+    'Total Profit/Loss': 1.0
+}
+# Results with fewer closed trades are left out of the statistics and the ranking
+MIN_TRADES = 1
+
+class Ranker:
+    """Weighted min-max score of backtest metrics, with running statistics and top-K selection.
+
+    update() folds new results into the running minimum and maximum of every
+    weighted metric, so results arriving in batches never require a pass over
+    the ones seen before. Each metric is scaled to 0-1 by those statistics
+    (values outside them, such as the infinite profit factor of a result
+    without losses, are clipped) and the score is the weighted sum. A missing
+    value, or a metric all results share, adds nothing whatever the sign of
+    its weight. top() keeps the best k results in a heap instead of sorting
+    them all.
+    """
+
+    def __init__(self, weights=WEIGHTS, min_trades=MIN_TRADES):
+        self.weights = dict(weights)
+        self.min_trades = min_trades
+        self.low = {metric: math.inf for metric in self.weights}
+        self.high = {metric: -math.inf for metric in self.weights}
+        self.count = 0
+
+    def eligible(self, metrics):
+        return metrics.get('Total Trades', 0) >= self.min_trades
+
+    def value(self, metrics, metric):
+        """A result's metric, or None when it is missing or NaN. A profit factor is infinite whenever
+        there are no losses, but without any profit either (0/0, e.g. only break-even trades) it is missing too."""
+        value = metrics.get(metric)
+        if value is None or math.isnan(value):
+            return None
+        if metric == 'Profit Factor' and value == math.inf and not metrics.get('Total Profit/Loss'):
+            return None
+        return value
+
+    def update(self, results):
+        """Fold the finite metric values of eligible results into the running statistics"""
+        for metrics in results:
+            if not self.eligible(metrics):
+                continue
+            self.count += 1
+            for metric in self.weights:
+                value = self.value(metrics, metric)
+                if value is not None and math.isfinite(value):
+                    self.low[metric] = min(self.low[metric], value)
+                    self.high[metric] = max(self.high[metric], value)
+
+    def score(self, metrics):
+        total = 0.0
+        for metric, weight in self.weights.items():
+            value, low, high = self.value(metrics, metric), self.low[metric], self.high[metric]
+            if value is None or not high > low:
+                continue
+            scaled = min(max((value - low) / (high - low), 0.0), 1.0)
+            total += weight * scaled if weight > 0 else -weight * (1 - scaled)
+        return total
+
+    def top(self, results, k=None):
+        """The k best-scoring eligible results (all of them by default), best first, each with its 'Score'"""
+        scored = ((self.score(metrics), -i, metrics) for i, metrics in enumerate(results) if self.eligible(metrics))
+        if k is None:
+            best = sorted(scored, reverse=True)
+        else:
+            best = heapq.nlargest(k, scored)
+        return [{**metrics, 'Score': score} for score, _, metrics in best]
+
+def stored_ranker(conn, weights=WEIGHTS, min_trades=MIN_TRADES):
+    """Ranker with the statistics stored in the results database, brought up to date with the results stored since.
+
+    The running minimum, maximum and count of every result ever stored are
+    kept per minimum trade count in the rank_stats table, together with the
+    last result_id folded in, so each ranking only reads the results added by
+    the runs since the previous one. The statistics are rebuilt from all
+    stored results when a weighted metric has none stored yet.
+    """
+    ranker = Ranker(weights, min_trades)
+    with conn:
+        conn.execute('BEGIN IMMEDIATE')
+        stats = load_rank_stats(conn, min_trades)
+        stored = {stats[metric][2:] for metric in ranker.weights if metric in stats}
+        last_result_id = 0
+        if len(stored) == 1 and all(metric in stats for metric in ranker.weights):
+            ranker.count, last_result_id = stored.pop()
+            for metric in ranker.weights:
+                ranker.low[metric], ranker.high[metric] = stats[metric][:2]
+        results = query_metrics(conn, latest=False, after=last_result_id)
+        ranker.update(results)
+        if results:
+            last_result_id = results[-1]['Result ID']
+        save_rank_stats(conn, min_trades, {metric: (ranker.low[metric], ranker.high[metric], ranker.count, last_result_id) for metric in ranker.weights})
+    return ranker
+
+def parse_weights(values):
+    """{metric: weight} from METRIC=WEIGHT strings"""
+    weights = {}
+    for value in values:
+        metric, weight = value.rsplit('=', 1)
+        weights[metric] = float(weight)
+    return weights
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Rank the newest backtest results in the results database by a weighted score')
+    parser.add_argument('--weight', action='append', default=[], metavar='METRIC=WEIGHT',
+                        help="Metric and its weight, negative to prefer low values (repeatable; replaces the default weights)")
+    parser.add_argument('--min-trades', type=int, default=MIN_TRADES, help=f'Minimum closed trades of a ranked result (default: {MIN_TRADES})')
+    parser.add_argument('--top', type=int, default=20, help='Results to show (default: 20)')
+    parser.add_argument('--strategy', default=None, help='Only this strategy')
+    parser.add_argument('--symbol', default=None, help='Only this symbol')
+    args = parser.parse_args()
+
+    with closing(connect()) as conn:
+        ranker = stored_ranker(conn, parse_weights(args.weight) if args.weight else WEIGHTS, args.min_trades)
+        results = query_metrics(conn, args.strategy, args.symbol)
+    ranked = pd.DataFrame(ranker.top(results, args.top))
+    print(f'Top {len(ranked)} of {sum(map(ranker.eligible, results))} results with at least {args.min_trades} trades, '
+          f'scaled by the statistics of {ranker.count} stored results')
+    print(ranked[[column for column in ['Strategy Title', 'Symbol', *ranker.weights, 'Score'] if column in ranked]])
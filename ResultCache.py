@@ -0,0 +1,52 @@
+import hashlib
+import json
+import os
+import pandas as pd
+
+# Directory holding one entry per backtest input fingerprint
+RESULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'BacktestCache')
+
+def data_fingerprint(df):
+    """Hash of the price slice, including its dates, that changes whenever any bar does"""
+    return hashlib.sha256(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes()).hexdigest()
+
+def result_key(df, strategy, version, params, settings):
+    """Content address for a backtest: price data, strategy and version, parameters and settings"""
+    payload = json.dumps({
+        'data': data_fingerprint(df),
+        'strategy': strategy,
+        'version': version,
+        'params': params,
+        'settings': settings
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def entry_dir(key):
+    return os.path.join(RESULT_CACHE_DIR, key[:2], key)
+
+def load_result(key):
+    """Return the cached (trade_log_df, performance_metrics) for key, or None on a miss"""
+    path = entry_dir(key)
+    try:
+        trade_log_df = pd.read_csv(os.path.join(path, 'trading_log.csv'), parse_dates=['Date Bought', 'Date Sold'], float_precision='round_trip')
+        with open(os.path.join(path, 'performance_metrics.json'), 'r') as f:
+            performance_metrics = json.load(f)
+    except (FileNotFoundError, ValueError, pd.errors.EmptyDataError):
+        return None
+    return trade_log_df, performance_metrics
+
+def store_result(key, trade_log_df, performance_metrics):
+    path = entry_dir(key)
+    # Build the entry under a temporary name and rename it, so readers never see half an entry
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    os.makedirs(tmp_path, exist_ok=True)
+    trade_log_df.to_csv(os.path.join(tmp_path, 'trading_log.csv'), index=False)
+    with open(os.path.join(tmp_path, 'performance_metrics.json'), 'w') as f:
+        json.dump(performance_metrics, f, indent=4)
+    try:
+        os.rename(tmp_path, path)
+    except OSError:
+        # Another worker stored the same result first
+        for name in os.listdir(tmp_path):
+            os.remove(os.path.join(tmp_path, name))
+        os.rmdir(tmp_path)
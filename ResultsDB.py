@@ -0,0 +1,182 @@
+import json
+import os
+import sqlite3
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from MetricsLog import encode_metrics, decode_metrics
+
+# SQLite database holding every backtest run with its metrics and trade logs
+RESULTS_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'BacktestResults.db')
+
+# Trade log columns and the trades table columns they are stored in
+TRADE_COLUMNS = {
+    'Date Bought': 'date_bought',
+    'Date Sold': 'date_sold',
+    'Quantity': 'quantity',
+    'Entry Price': 'entry_price',
+    'Exit Price': 'exit_price',
+    'Profit/Loss': 'profit_loss',
+    'Stopped Out': 'stopped_out',
+    'Exit Reason': 'exit_reason'
+}
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY,
+    started TEXT NOT NULL,
+    description TEXT
+);
+CREATE TABLE IF NOT EXISTS results (
+    result_id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs (run_id),
+    strategy TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    params TEXT NOT NULL,
+    metrics TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_key ON results (strategy, symbol, params, result_id);
+CREATE INDEX IF NOT EXISTS results_symbol ON results (symbol);
+CREATE INDEX IF NOT EXISTS results_run ON results (run_id);
+CREATE TABLE IF NOT EXISTS trades (
+    result_id INTEGER NOT NULL REFERENCES results (result_id),
+    trade INTEGER NOT NULL,
+    date_bought TEXT,
+    date_sold TEXT,
+    quantity REAL,
+    entry_price REAL,
+    exit_price REAL,
+    profit_loss REAL,
+    stopped_out INTEGER,
+    exit_reason TEXT,
+    PRIMARY KEY (result_id, trade)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rank_stats (
+    min_trades INTEGER NOT NULL,
+    metric TEXT NOT NULL,
+    low REAL,
+    high REAL,
+    count INTEGER NOT NULL,
+    last_result_id INTEGER NOT NULL,
+    PRIMARY KEY (min_trades, metric)
+) WITHOUT ROWID;
+'''
+
+def connect(path=RESULTS_DB):
+    """Open the results database, creating its tables and indexes on first use"""
+    conn = sqlite3.connect(path)
+    # Readers (dashboards, rankings) do not block the writer and vice versa
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.executescript(SCHEMA)
+    return conn
+
+def start_run(conn, description=None):
+    """Record a new run and return its run_id"""
+    with conn:
+        cursor = conn.execute('INSERT INTO runs (started, description) VALUES (?, ?)',
+                              (datetime.now().isoformat(timespec='seconds'), description))
+    return cursor.lastrowid
+
+def trade_rows(result_id, trade_log_df):
+    """trades table rows of a trade log, with dates as ISO strings and missing values as NULL"""
+    log = trade_log_df.reindex(columns=list(TRADE_COLUMNS)).copy()
+    for column in ('Date Bought', 'Date Sold'):
+        log[column] = pd.to_datetime(log[column]).dt.strftime('%Y-%m-%d')
+    log = log.astype(object).where(log.notna(), None)
+    return [(result_id, trade, *row) for trade, row in enumerate(log.itertuples(index=False, name=None))]
+
+def record_results(conn, run_id, results):
+    """Store the (strategy, symbol, params, trade_log_df, performance_metrics) results of a run.
+
+    Metrics are stored as strict JSON, with infinities as "Infinity"/"-Infinity"
+    strings and NaN as null like the metrics log (MetricsLog.encode_metrics).
+
+    Everything is written in one transaction with one bulk insert per table,
+    so a run is either stored completely or not at all.
+    """
+    with conn:
+        conn.execute('BEGIN IMMEDIATE')
+        next_id = conn.execute('SELECT COALESCE(MAX(result_id), 0) + 1 FROM results').fetchone()[0]
+        result_rows, trades = [], []
+        for result_id, (strategy, symbol, params, trade_log_df, performance_metrics) in enumerate(results, next_id):
+            result_rows.append((result_id, run_id, strategy, symbol, json.dumps(list(params)), encode_metrics(performance_metrics)))
+            trades.extend(trade_rows(result_id, trade_log_df))
+        conn.executemany('INSERT INTO results (result_id, run_id, strategy, symbol, params, metrics) VALUES (?, ?, ?, ?, ?, ?)', result_rows)
+        conn.executemany(f"INSERT INTO trades VALUES ({', '.join('?' * (len(TRADE_COLUMNS) + 2))})", trades)
+
+def metric_records(rows):
+    """Performance metrics dicts from (result_id, run_id, metrics JSON) rows, with the infinities restored"""
+    return [{'Result ID': result_id, 'Run ID': run_id, **decode_metrics(metrics)} for result_id, run_id, metrics in rows]
+
+def query_metrics(conn, strategy=None, symbol=None, run_id=None, latest=True, after=None):
+    """Performance metrics dicts of the stored results, optionally of one strategy, symbol or run,
+    or only those stored after the result_id `after`.
+
+    With latest (the default) only the newest matching result of every
+    (strategy, symbol, parameters) backtest is returned, found through the
+    results_key index, so the newest of a run is returned even when a later run
+    repeated the backtest.
+    """
+    conditions, values = [], []
+    for column, value in (('strategy', strategy), ('symbol', symbol), ('run_id', run_id)):
+        if value is not None:
+            conditions.append(f'{column} = ?')
+            values.append(value)
+    if after is not None:
+        conditions.append('result_id > ?')
+        values.append(after)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    if latest:
+        where = f'WHERE result_id IN (SELECT MAX(result_id) FROM results {where} GROUP BY strategy, symbol, params)'
+    return metric_records(conn.execute(f'SELECT result_id, run_id, metrics FROM results {where} ORDER BY result_id', values))
+
+def load_metrics(conn, strategy=None, symbol=None, run_id=None, latest=True):
+    """query_metrics() as a DataFrame"""
+    return pd.DataFrame(query_metrics(conn, strategy, symbol, run_id, latest))
+
+def load_rank_stats(conn, min_trades):
+    """{metric: (low, high, count, last_result_id)} of the ranking statistics stored for a minimum trade count;
+    low and high are infinite while no value has been seen"""
+    rows = conn.execute('SELECT metric, low, high, count, last_result_id FROM rank_stats WHERE min_trades = ?', (min_trades,))
+    return {metric: (float('inf') if low is None else low, float('-inf') if high is None else high, count, last_result_id)
+            for metric, low, high, count, last_result_id in rows}
+
+def save_rank_stats(conn, min_trades, stats):
+    """Store {metric: (low, high, count, last_result_id)} ranking statistics (see RankSimple.stored_ranker)"""
+    conn.executemany('INSERT OR REPLACE INTO rank_stats VALUES (?, ?, ?, ?, ?, ?)', [
+        (min_trades, metric, low if low != float('inf') else None, high if high != float('-inf') else None, count, last_result_id)
+        for metric, (low, high, count, last_result_id) in stats.items()
+    ])
+
+def load_history(conn, strategy, symbol, params=None):
+    """Metrics of every stored run of a strategy on a symbol (and parameters), oldest first, with the run start time"""
+    query = 'SELECT result_id, run_id, metrics FROM results WHERE strategy = ? AND symbol = ?'
+    values = [strategy, symbol]
+    if params is not None:
+        query += ' AND params = ?'
+        values.append(json.dumps(list(params)))
+    history = pd.DataFrame(metric_records(conn.execute(query + ' ORDER BY result_id', values)))
+    if not history.empty:
+        started = dict(conn.execute('SELECT run_id, started FROM runs'))
+        history.insert(2, 'Run Started', pd.to_datetime(history['Run ID'].map(started)))
+    return history
+
+def load_trade_log(conn, result_id):
+    """Trade log of one stored result, in the BacktestEngine column layout"""
+    rows = conn.execute(f"SELECT {', '.join(TRADE_COLUMNS.values())} FROM trades WHERE result_id = ? ORDER BY trade", (result_id,))
+    trade_log_df = pd.DataFrame(rows.fetchall(), columns=list(TRADE_COLUMNS))
+    for column in ('Date Bought', 'Date Sold'):
+        trade_log_df[column] = pd.to_datetime(trade_log_df[column])
+    trade_log_df['Stopped Out'] = trade_log_df['Stopped Out'].astype(bool)
+    return trade_log_df
+
+def load_closed_profit_loss(conn):
+    """{'strategy/symbol/params': Profit/Loss array of the closed trades} of the newest result of every backtest"""
+    rows = conn.execute("""
+        SELECT r.strategy, r.symbol, r.params, t.profit_loss FROM results r JOIN trades t ON t.result_id = r.result_id
+        WHERE r.result_id IN (SELECT MAX(result_id) FROM results GROUP BY strategy, symbol, params) AND t.profit_loss IS NOT NULL
+        ORDER BY r.result_id, t.trade""")
+    logs = {}
+    for strategy, symbol, params, profit_loss in rows:
+        logs.setdefault(f'{strategy}/{symbol}/{params}', []).append(profit_loss)
+    return {name: np.array(values) for name, values in logs.items()}
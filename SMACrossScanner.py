@@ -1,6 +1,7 @@
-import requests
 import pandas as pd
 import numpy as np
+from DataCache import load_stocks
+from PanelIndicators import Panel, signal_rows
 
 # Replace with your Financial Modeling Prep API key
 #api_key = 'api_here'
@@ -42,62 +43,61 @@ API_KEY = 'api_here'  # Replace with your Financial Modeling Prep API key
 SHORT_SMA = 5
 LONG_SMA = 10
 
-def fetch_historical_data(symbol, api_key):
-    url = f'https://financialmodelingprep.com/api/v3/historical-price-full/{symbol}?apikey={api_key}'
-    response = requests.get(url)
-    data = response.json()
-    if 'historical' in data:
-        df = pd.DataFrame(data['historical'])
-        df['date'] = pd.to_datetime(df['date'])
-        df.set_index('date', inplace=True)
-        df.sort_index(inplace=True)
-        return df
-    else:
-        return pd.DataFrame()
+# Bars each scan needs: the longest SMA plus the previous bar
+LOOKBACK = max(long_sma for _, long_sma in SMA_COMBINATIONS) + 1
 
-def calculate_smas(df, short_sma, long_sma):
-    df[f'SMA_{short_sma}'] = df['close'].rolling(window=short_sma).mean()
-    df[f'SMA_{long_sma}'] = df['close'].rolling(window=long_sma).mean()
-    return df
+def calculate_smas(panel, windows):
+    # Every window used by any combination, from one prefix-sum pass
+    return panel.sma_bank(windows)
 
-def detect_crossovers(df, short_sma, long_sma):
-    df['Signal'] = 0
-    df['Signal'][short_sma:] = np.where(df[f'SMA_{short_sma}'][short_sma:] > df[f'SMA_{long_sma}'][short_sma:], 1, 0)
-    df['Crossover'] = df['Signal'].diff()
-    return df
+def detect_crossovers(panel, bank, windows, combinations):
+    """Golden Crosses on each symbol's latest bar for every (short, long) combination at once.
 
-def scan_stocks(stocks, short_sma, long_sma, api_key):
-    results = []
-    for stock in stocks:
-        df = fetch_historical_data(stock, api_key)
-        if not df.empty:
-            df = calculate_smas(df, short_sma, long_sma)
-            df = detect_crossovers(df, short_sma, long_sma)
-            latest_date = df.index.max()
-            crossovers = df[(df['Crossover'] == 1) & (df.index == latest_date)]  # Filter for Golden Crosses today
-            for date, row in crossovers.iterrows():
-                results.append({
-                    'Stock': stock,
-                    'Date': date,
-                    'Close': row['close'],
-                    'Short_SMA': row[f'SMA_{short_sma}'],
-                    'Long_SMA': row[f'SMA_{long_sma}'],
-                    'Crossover_Type': 'Golden Cross'
-                })
-    return pd.DataFrame(results)
+    Returns a (combinations, symbols) boolean array. The signal is 1 from bar
+    short_sma onwards while the short SMA is above the long one, and a golden
+    cross is the signal stepping from 0 to 1.
+    """
+    short_rows = [windows.index(short_sma) for short_sma, _ in combinations]
+    long_rows = [windows.index(long_sma) for _, long_sma in combinations]
+    short_lengths = np.array([short_sma for short_sma, _ in combinations])[:, None]
 
-# Iterate over SMA combinations and save results to files
-for short_sma, long_sma in SMA_COMBINATIONS:
-    results = scan_stocks(STOCKS, short_sma, long_sma, API_KEY)
-    filename = f'sma_{short_sma}_{long_sma}_crosses_today.csv'
-    results.to_csv(filename, index=False)
-    print(f'Results for SMA {short_sma} and {long_sma} saved to {filename}')
+    def signal(offset):
+        latest = panel.latest_values(bank, offset)
+        return (panel.bar_rows(offset) >= short_lengths) & (latest[short_rows] > latest[long_rows])
+    return signal(0) & ~signal(1)
 
-# Print the results of Golden Crosses today
-print("Stocks with Golden Crosses today:")
-print(results)
-# results.to_csv('golden_crosses_today.csv', index=False)  # Optionally save to CSV
+def scan_stocks(panel, combinations=SMA_COMBINATIONS):
+    """Golden Crosses today for every SMA combination: {(short_sma, long_sma): results DataFrame}"""
+    windows = sorted({length for combination in combinations for length in combination})
+    bank = calculate_smas(panel, windows)
+    crossovers = detect_crossovers(panel, bank, windows, combinations)
+    latest = panel.latest_values(bank)
+    close = panel.latest(panel.close)
 
-# Print or save the results
-print(results)
-# results.to_csv('sma_crossovers.csv', index=False)
+    results = {}
+    for i, (short_sma, long_sma) in enumerate(combinations):
+        results[(short_sma, long_sma)] = signal_rows(panel, pd.Series(crossovers[i], index=panel.symbols), {
+            'Close': close,
+            'Short_SMA': pd.Series(latest[windows.index(short_sma)], index=panel.symbols),
+            'Long_SMA': pd.Series(latest[windows.index(long_sma)], index=panel.symbols),
+            'Crossover_Type': 'Golden Cross'
+        })
+    return results
+
+def run_scan(stock_data):
+    """Scanner plugin entry point used by ScanDriver: returns {output filename: results DataFrame}"""
+    results = scan_stocks(Panel(stock_data))
+    return {f'sma_{short_sma}_{long_sma}_crosses_today.csv': df for (short_sma, long_sma), df in results.items()}
+
+if __name__ == '__main__':
+    # Fetch every symbol once and reuse it for all parameter sets
+    stock_data = load_stocks(STOCKS, API_KEY)
+
+    # Evaluate every parameter set and save results to files
+    for filename, results in run_scan(stock_data).items():
+        results.to_csv(filename, index=False)
+        print(f'Results saved to {filename}')
+
+    # Print the results of Golden Crosses today
+    print("Stocks with Golden Crosses today:")
+    print(results)
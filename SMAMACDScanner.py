@@ -1,6 +1,6 @@
-import requests
 import pandas as pd
-import numpy as np
+from DataCache import load_stocks
+from PanelIndicators import Panel, signal_rows, macd_warmup
 
 # Constants
 API_KEY = 'api_here'  # Replace with your Financial Modeling Prep API key
@@ -44,66 +44,57 @@ STOCKS = [
     "XLU"                         # Utilities Select Sector SPDR Fund
 ]
 
-def fetch_historical_data(symbol, api_key):
-    url = f'https://financialmodelingprep.com/api/v3/historical-price-full/{symbol}?apikey={api_key}'
-    response = requests.get(url)
-    data = response.json()
-    if 'historical' in data:
-        df = pd.DataFrame(data['historical'])
-        df['date'] = pd.to_datetime(df['date'])
-        df.set_index('date', inplace=True)
-        df.sort_index(inplace=True)
-        return df
-    else:
-        return pd.DataFrame()
+# Bars each scan needs: SMA200 today, or the MACD warm-up plus the previous bar
+LOOKBACK = max(200, macd_warmup() + 1)
 
-def calculate_indicators(df):
-    df['SMA50'] = df['close'].rolling(window=50).mean()
-    df['SMA200'] = df['close'].rolling(window=200).mean()
-    df['SMA5'] = df['close'].rolling(window=5).mean()
-    df['SMA10'] = df['close'].rolling(window=10).mean()
+def calculate_indicators(panel):
+    # All four SMAs from one prefix-sum pass
+    smas = panel.smas([50, 200, 5, 10])
+    indicators = {
+        'SMA50': smas[50],
+        'SMA200': smas[200],
+        'SMA5': smas[5],
+        'SMA10': smas[10]
+    }
 
     # Calculate MACD
-    df['EMA12'] = df['close'].ewm(span=12, adjust=False).mean()
-    df['EMA26'] = df['close'].ewm(span=26, adjust=False).mean()
-    df['MACD'] = df['EMA12'] - df['EMA26']
-    df['Signal_Line'] = df['MACD'].ewm(span=9, adjust=False).mean()
+    indicators['MACD'], indicators['Signal_Line'], _ = panel.macd()
 
-    return df
+    return indicators
 
-def scan_stocks(stocks, api_key):
-    results = []
-    for stock in stocks:
-        df = fetch_historical_data(stock, api_key)
-        if not df.empty:
-            df = calculate_indicators(df)
+def scan_stocks(stock_data):
+    # Indicators for every symbol at once, read back at each symbol's latest bar and the few before it
+    panel = Panel(stock_data)
+    indicators = calculate_indicators(panel)
+    recent = {name: panel.latest(values) for name, values in indicators.items()}
+    close = panel.latest(panel.close)
 
-            latest_date = df.index.max()
-            recent_data = df.loc[latest_date]
+    def at(name, offset):
+        return panel.latest(indicators[name], offset)
 
-            macd_crossover = (recent_data['MACD'] > recent_data['Signal_Line']) & (df['MACD'].shift(1).loc[latest_date] <= df['Signal_Line'].shift(1).loc[latest_date])
-            sma_crossover_recent = any((df['SMA5'].shift(i) > df['SMA10'].shift(i)).iloc[-1] & (df['SMA5'].shift(i+1) <= df['SMA10'].shift(i+1)).iloc[-1] for i in range(3))
-            sma5_slope_positive = recent_data['SMA5'] > df['SMA5'].shift(1).loc[latest_date]
+    macd_crossover = (recent['MACD'] > recent['Signal_Line']) & (at('MACD', 1) <= at('Signal_Line', 1))
+    sma_crossover_recent = pd.concat([(at('SMA5', i) > at('SMA10', i)) & (at('SMA5', i + 1) <= at('SMA10', i + 1)) for i in range(3)], axis=1).any(axis=1)
+    sma5_slope_positive = recent['SMA5'] > at('SMA5', 1)
 
-            if recent_data['close'] > recent_data['SMA50'] and recent_data['close'] > recent_data['SMA200'] and macd_crossover and sma_crossover_recent and sma5_slope_positive:
-                results.append({
-                    'Stock': stock,
-                    'Date': latest_date,
-                    'Close': recent_data['close'],
-                    'SMA50': recent_data['SMA50'],
-                    'SMA200': recent_data['SMA200'],
-                    'MACD': recent_data['MACD'],
-                    'Signal Line': recent_data['Signal_Line'],
-                    'SMA5': recent_data['SMA5'],
-                    'SMA10': recent_data['SMA10']
-                })
+    buy_signal = (close > recent['SMA50']) & (close > recent['SMA200']) & macd_crossover & sma_crossover_recent & sma5_slope_positive
+    return signal_rows(panel, buy_signal, {
+        'Close': close,
+        'SMA50': recent['SMA50'],
+        'SMA200': recent['SMA200'],
+        'MACD': recent['MACD'],
+        'Signal Line': recent['Signal_Line'],
+        'SMA5': recent['SMA5'],
+        'SMA10': recent['SMA10']
+    })
 
-    return pd.DataFrame(results)
+FILENAME = 'sma_macd_slope_scanner_results.csv'
 
-# Scan stocks
-results = scan_stocks(STOCKS, API_KEY)
+def run_scan(stock_data):
+    """Scanner plugin entry point used by ScanDriver: returns {output filename: results DataFrame}"""
+    return {FILENAME: scan_stocks(stock_data)}
 
-# Save results to CSV
-filename = 'sma_macd_slope_scanner_results.csv'
-results.to_csv(filename, index=False)
-print(f'Results saved to {filename}')
+if __name__ == '__main__':
+    # Scan the stocks and save results to a file
+    results = scan_stocks(load_stocks(STOCKS, API_KEY))
+    results.to_csv(FILENAME, index=False)
+    print(f'Results saved to {FILENAME}')
@@ -1,6 +1,6 @@
-import requests
-import pandas as pd
-import numpy as np
+from DataCache import load_stocks
+from PanelIndicators import Panel, signal_rows
+from StreamingIndicators import RollingMean, Shifted, latest_values, streaming_rows
 
 # Constants
 API_KEY = 'api_here'  # Replace with your Financial Modeling Prep API key
@@ -46,53 +46,67 @@ STOCKS = [
 
 SMA_LENGTHS = [10, 20, 50, 100, 200]
 
-def fetch_historical_data(symbol, api_key):
-    url = f'https://financialmodelingprep.com/api/v3/historical-price-full/{symbol}?apikey={api_key}'
-    response = requests.get(url)
-    data = response.json()
-    if 'historical' in data:
-        df = pd.DataFrame(data['historical'])
-        df['date'] = pd.to_datetime(df['date'])
-        df.set_index('date', inplace=True)
-        df.sort_index(inplace=True)
-        return df
-    else:
-        return pd.DataFrame()
+# Bars each scan needs: the longest SMA, the 5-bar slope and the previous bar's slope
+LOOKBACK = max(SMA_LENGTHS) + 5 + 1
 
-def calculate_sma(df, sma_length):
-    df[f'SMA_{sma_length}'] = df['close'].rolling(window=sma_length).mean()
-    return df
+def detect_slope_changes(sma, slope_length=5):  # You can adjust the slope length if needed
+    return (sma - sma.shift(slope_length)) / slope_length
 
-def detect_slope_changes(df, sma_length):
-    slope_length = 5  # You can adjust the slope length if needed
-    sma_col = f'SMA_{sma_length}'
-    df['SMA_Slope'] = (df[sma_col] - df[sma_col].shift(slope_length)) / slope_length
-    df['Positive_Slope_Change'] = (df['SMA_Slope'] > 0) & (df['SMA_Slope'].shift(1) <= 0)
-    return df
+def scan_stocks(panel, sma_length):
+    # SMA and slope for every symbol at once, read back at each symbol's latest bar
+    sma = panel.sma(sma_length)
+    slope = detect_slope_changes(sma)
+    recent_slope = panel.latest(slope)
+    positive_slope_change = (recent_slope > 0) & (panel.latest(slope, 1) <= 0)
+    return signal_rows(panel, positive_slope_change, {
+        'Close': panel.latest(panel.close),
+        'SMA_Length': sma_length,
+        'SMA_Value': panel.latest(sma),
+        'SMA_Slope': recent_slope
+    })
 
-def scan_stocks(stocks, sma_length, api_key):
-    results = []
-    for stock in stocks:
-        df = fetch_historical_data(stock, api_key)
-        if not df.empty:
-            df = calculate_sma(df, sma_length)
-            df = detect_slope_changes(df, sma_length)
-            latest_date = df.index.max()
-            positive_slope_changes = df[(df['Positive_Slope_Change']) & (df.index == latest_date)]
-            for date, row in positive_slope_changes.iterrows():
-                results.append({
-                    'Stock': stock,
-                    'Date': date,
-                    'Close': row['close'],
-                    'SMA_Length': sma_length,
-                    'SMA_Value': row[f'SMA_{sma_length}'],
-                    'SMA_Slope': row['SMA_Slope']
-                })
-    return pd.DataFrame(results)
+def run_scan(stock_data):
+    """Scanner plugin entry point used by ScanDriver: returns {output filename: results DataFrame}"""
+    # The panel is built once and shared by every parameter set
+    panel = Panel(stock_data)
+    # Every SMA length from one prefix-sum pass; scan_stocks() then reads them from the indicator cache
+    panel.sma_bank(SMA_LENGTHS)
+    outputs = {}
+    for sma_length in SMA_LENGTHS:
+        outputs[f'sma_{sma_length}_slope_changes_today.csv'] = scan_stocks(panel, sma_length)
+    return outputs
 
-# Iterate over SMA lengths and save results to files
-for sma_length in SMA_LENGTHS:
-    results = scan_stocks(STOCKS, sma_length, API_KEY)
-    filename = f'sma_{sma_length}_slope_changes_today.csv'
-    results.to_csv(filename, index=False)
-    print(f'Results for SMA {sma_length} saved to {filename}')
+def make_indicators():
+    indicators = {}
+    for sma_length in SMA_LENGTHS:
+        indicators[f'SMA_{sma_length}'] = RollingMean(sma_length)
+        indicators[f'SMA_{sma_length}_Shifted'] = Shifted(RollingMean(sma_length), 5)
+    return indicators
+
+def scan_streaming(stock_data, indicators):
+    # The slope of each SMA today and on the previous bar, from each symbol's streamed SMAs
+    outputs = {}
+    for sma_length in SMA_LENGTHS:
+        sma, shifted = f'SMA_{sma_length}', f'SMA_{sma_length}_Shifted'
+        latest = latest_values(stock_data, indicators, lambda symbol: {
+            'SMA_Value': symbol[sma].value,
+            'SMA_Slope': (symbol[sma].value - symbol[shifted].value) / 5,
+            'Previous_Slope': (symbol[sma].previous - symbol[shifted].previous) / 5
+        })
+        positive_slope_change = (latest['SMA_Slope'] > 0) & (latest['Previous_Slope'] <= 0)
+        outputs[f'sma_{sma_length}_slope_changes_today.csv'] = streaming_rows(stock_data, positive_slope_change, {
+            'Close': latest['Close'],
+            'SMA_Length': sma_length,
+            'SMA_Value': latest['SMA_Value'],
+            'SMA_Slope': latest['SMA_Slope']
+        })
+    return outputs
+
+if __name__ == '__main__':
+    # Fetch every symbol once and reuse it for all parameter sets
+    stock_data = load_stocks(STOCKS, API_KEY)
+
+    # Evaluate every parameter set and save results to files
+    for filename, results in run_scan(stock_data).items():
+        results.to_csv(filename, index=False)
+        print(f'Results saved to {filename}')
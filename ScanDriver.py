@@ -1,41 +1,42 @@
-import glob
-import subprocess
 import os
+import argparse
 import pandas as pd
 import re
 from collections import defaultdict
+from ScannerRunner import discover_scanners, run_scanners
+from BacktestRunner import run_backtests
+from RankSimple import MIN_TRADES, stored_ranker
+
+# Parse command-line arguments
+parser = argparse.ArgumentParser(description='Run every scanner, consolidate the signals and backtest them')
+parser.add_argument('--isolated', action='store_true', help='Run each scanner in its own Python process instead of in-process')
+parser.add_argument('--workers', type=int, default=None, help='Backtest worker processes (default: one per CPU core)')
+parser.add_argument('--tail', action='store_true', help="Scan only the last bars each scanner's signals depend on (its LOOKBACK)")
+parser.add_argument('--check-tail', action='store_true', help='Also scan the full history and report any difference from the tail-window scan')
+parser.add_argument('--streaming', action='store_true', help='Scan from checkpointed streaming indicators, feeding in only the bars added since the last run')
+parser.add_argument('--check-streaming', action='store_true', help='Also scan the full history and report any difference from the streaming scan')
+parser.add_argument('--top', type=int, default=None, help='Keep only the best N results in the ranking (default: all)')
+parser.add_argument('--min-trades', type=int, default=MIN_TRADES, help=f'Leave results with fewer closed trades out of the ranking (default: {MIN_TRADES})')
+args = parser.parse_args()
+
 # Define the directory to search for scripts
 directory = '.'  # Change to the directory where your scripts are located if needed
-import pdb
 # Find all files ending with *Scanner.py
-scanner_scripts = glob.glob(os.path.join(directory, '*Scanner.py'))
+scanner_scripts = discover_scanners(directory)
 dataframes = []
 
-# Execute each script
-for script in scanner_scripts:
-    print(f'Executing {script}...')
-    result = subprocess.run(['python', script], capture_output=True, text=True)
-    if result.returncode == 0:
-        print(f'{script} executed successfully.')
-    else:
-        print(f'Error executing {script}:')
-        print(result.stderr)
+# Run each scanner; results come back as DataFrames keyed by output filename
+scan_results = run_scanners(scanner_scripts, directory, isolated=args.isolated, tail=args.tail, check_tail=args.check_tail, streaming=args.streaming, check_streaming=args.check_streaming)
 
 print('All scripts executed.')
 
-# Post-processing: Find stock symbols that appear in more than one CSV file
-csv_files = glob.glob(os.path.join(directory, '*.csv'))
+# Post-processing: Find stock symbols that appear in more than one scanner output
 symbol_files_map = defaultdict(list)
 
-for csv_file in csv_files:
-    try:
-        df = pd.read_csv(csv_file)
-        if not df.empty:
-            for symbol in df['Stock'].unique():
-                symbol_files_map[symbol].append(csv_file)
-    except pd.errors.EmptyDataError:
-        print(f'Skipping empty file: {csv_file}')
-        continue
+for filename, df in scan_results.items():
+    if not df.empty and 'Stock' in df.columns:
+        for symbol in df['Stock'].unique():
+            symbol_files_map[symbol].append(filename)
 
 # Print stock symbols that appear in more than one CSV
 print("\nStock symbols that appear in more than one CSV file:")
@@ -99,28 +100,22 @@ def extract_strategy_and_signals(filename):
         strategy = 'N/A'
     return strategy, short_signal, long_signal, signal_length
 
-# Loop through all the files in the directory
-for filename in os.listdir(directory):
-    if filename.endswith('.csv'):
-        filepath = os.path.join(directory, filename)
-        try:
-            # Read the CSV file into a DataFrame
-            df = pd.read_csv(filepath)
-            if df.empty:
-                print(f'Skipping empty file: {filename}')
-                continue
-            # Extract the strategy and signals from the filename
-            strategy, short_signal, long_signal, signal_length = extract_strategy_and_signals(filename)
-            if strategy != 'N/A':
-                # Add the new columns to the DataFrame
-                df['strategy'] = strategy
-                df['short_signal'] = short_signal
-                df['long_signal'] = long_signal
-                df['signal_length'] = signal_length
-                # Append the DataFrame to the list
-                dataframes.append(df)
-        except pd.errors.EmptyDataError:
-            print(f'Skipping completely empty file: {filename}')
+# Loop through the results of this run
+for filename, df in scan_results.items():
+    if df.empty:
+        print(f'Skipping empty results: {filename}')
+        continue
+    # Extract the strategy and signals from the filename
+    strategy, short_signal, long_signal, signal_length = extract_strategy_and_signals(filename)
+    if strategy != 'N/A':
+        # Add the new columns to a copy of the DataFrame
+        df = df.copy()
+        df['strategy'] = strategy
+        df['short_signal'] = short_signal
+        df['long_signal'] = long_signal
+        df['signal_length'] = signal_length
+        # Append the DataFrame to the list
+        dataframes.append(df)
 
 # Concatenate all the DataFrames into a single DataFrame
 if dataframes:
@@ -141,107 +136,33 @@ else:
 # Define the path to the consolidated CSV file
 consolidated_csv = 'consolidated_trades.csv'
 
-# Define the paths to the backtest scripts
-scripts = {
-    'EMA Slope Change': 'BackTest/EMASlopeBacktest.py',
-    'SMA Cross': 'BackTest/SMACrossBacktest.py',
-    'Williams Alligator': 'BackTest/WIlliamsAlligatorBacktest.py',
-    'MACD': 'BackTest/MACDRSIBacktest.py',
-    'SMA Slope Change': 'BackTest/SMASlopeBacktest.py',
-    'MACD SMA': 'BackTest/SMAMACDBacktest.py' ,
-    'Slope' : 'BackTest/SlopeBacktest.py'
-}
-
 # Load the consolidated CSV into a DataFrame
 df = pd.read_csv(consolidated_csv)
 
-# Define a function to run the backtest script with the given arguments
-def run_backtest(script, args):
-    cmd = ['python3', script] + args
-    print(f"Running: {' '.join(cmd)}")
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    if result.returncode != 0:
-        print(f"Error running {script}: {result.stderr}")
-    else:
-        print(f"Output: {result.stdout}")
-
-# Walk through the DataFrame and invoke the relevant scripts
-for _, row in df.iterrows():
-    strategy = row['strategy']
-    symbol = row['Stock']
-    if strategy in scripts:
-        script = scripts[strategy]
-        if strategy == 'EMA Slope Change':
-            length = row['signal_length']  # or 'long_signal' depending on your data
-            args = [symbol, str(int(length))]
-        elif strategy == 'SMA Cross':
-            short_length = row['short_signal']
-            long_length = row['long_signal']
-            args = [symbol, str(int(short_length)), str(int(long_length))]
-        elif strategy == 'Williams Alligator':
-            args = [symbol]
-        elif strategy == 'MACD':
-            args = [symbol]
-        elif strategy == 'SMA Slope Change':
-            length = row['signal_length']  # or 'long_signal' depending on your data
-            args = [symbol, str(int(length))]
-        elif strategy == 'MACD SMA':
-            args = [symbol]
-        elif strategy == 'Slope':
-            args = [symbol]
-        else:
-            continue
-        print("Running strategy:",strategy)
-        run_backtest(script, args)
-
-
-import json
-import numpy as np
-
-# Define the directory to start the search
-start_directory = '.'
-
-# Initialize a list to store the performance metrics
-performance_metrics_list = []
-
-# Walk through the directory and subdirectories to find performance_metrics.json files
-for root, _, files in os.walk(start_directory):
-    for file in files:
-        if file == 'performance_metrics.json':
-            file_path = os.path.join(root, file)
-            try:
-                with open(file_path, 'r') as f:
-                    metrics = json.load(f)
-                    performance_metrics_list.append(metrics)
-            except Exception as e:
-                print(f"Error reading {file_path}: {e}")
-
-# Extract the values for normalization
-percent_profitable = [metrics["Percent Profitable"] for metrics in performance_metrics_list]
-profit_factor = [metrics["Profit Factor"] for metrics in performance_metrics_list]
-total_profit_loss = [metrics["Total Profit/Loss"] for metrics in performance_metrics_list]
-
-# Normalize the values using min-max normalization
-percent_profitable_norm = (np.array(percent_profitable) - np.min(percent_profitable)) / (np.max(percent_profitable) - np.min(percent_profitable))
-profit_factor_norm = (np.array(profit_factor) - np.min(profit_factor)) / (np.max(profit_factor) - np.min(profit_factor))
-total_profit_loss_norm = (np.array(total_profit_loss) - np.min(total_profit_loss)) / (np.max(total_profit_loss) - np.min(total_profit_loss))
-
-# Combine the normalized values into a single score
-scores = percent_profitable_norm + profit_factor_norm + total_profit_loss_norm
-
-# Add the scores to the performance metrics
-for i, metrics in enumerate(performance_metrics_list):
-    metrics["Score"] = scores[i]
-
-# Sort the list of dictionaries by the combined score
-performance_metrics_list.sort(key=lambda x: x["Percent Profitable"], reverse=True)
+# Run each unique (strategy, symbol, parameters) backtest once, spread across all cores
+run_id, backtest_metrics = run_backtests(df, max_workers=args.workers)
+print(backtest_metrics)
+
+
+from contextlib import closing
+from datetime import datetime
+from MetricsLog import METRICS_LOG, append_metrics
+from ResultsDB import connect, query_metrics
+
+# Fold only the results stored since the last ranking (this run's) into the stored running statistics,
+# then load the metrics this run stored, so the log only grows by this run's results
+with closing(connect()) as conn:
+    ranker = stored_ranker(conn, min_trades=args.min_trades)
+    performance_metrics_list = query_metrics(conn, run_id=run_id)
+
+# Score this run's results by their weighted metrics, scaled by the statistics of every stored result, and sort by that score
+performance_metrics_list = ranker.top(performance_metrics_list, args.top)
 
 # Define the output file path
-output_file_path = os.path.join(os.getcwd(), 'performance_metrics.json')
+output_file_path = os.path.join(os.getcwd(), METRICS_LOG)
 
-# Save the sorted list to the JSON file
-with open(output_file_path, 'w') as f:
-    for metrics in performance_metrics_list:
-        f.write(json.dumps(metrics, indent=4) + '\n')
+# Append this ranking to the JSON Lines file, stamped so each run's ranking can be told apart
+ranked_at = datetime.now().isoformat(timespec='seconds')
+append_metrics(output_file_path, ({'Ranked At': ranked_at, **metrics} for metrics in performance_metrics_list))
 
-print(f'Performance metrics saved to {output_file_path}')
+print(f'Performance metrics appended to {output_file_path}')
@@ -0,0 +1,172 @@
+import glob
+import importlib.util
+import os
+import subprocess
+from collections import defaultdict
+import numpy as np
+import pandas as pd
+from DataCache import load_stocks
+from StreamingIndicators import STATE_DIR, update_symbol
+
+# A scanner plugin is a *Scanner.py module that defines STOCKS, API_KEY and
+# run_scan(stock_data) -> {output filename: results DataFrame}. Its script-mode
+# code must sit under `if __name__ == '__main__':` so it can be imported.
+# Plugins may also define LOOKBACK, the number of trailing bars per symbol their
+# signals for the latest bar depend on, which enables tail-window scans, and
+# make_indicators() -> {name: StreamingIndicator} with
+# scan_streaming(stock_data, {symbol: indicators at its latest bar}), which
+# enables streaming scans from checkpointed indicator state.
+
+# Relative tolerance for numeric columns when checking a tail-window scan against a full-history one
+TAIL_CHECK_RTOL = 1e-6
+
+def tail_frames(frames, lookback):
+    """Only the last `lookback` bars of every frame"""
+    return {stock: df.iloc[-lookback:] for stock, df in frames.items()}
+
+def compare_scan_results(full, tail, rtol=TAIL_CHECK_RTOL):
+    """Differences between two run_scan() outputs: the same rows, and numeric values within rtol"""
+    differences = []
+    for filename in sorted(set(full) | set(tail)):
+        full_df, tail_df = full.get(filename, pd.DataFrame()), tail.get(filename, pd.DataFrame())
+        full_rows = set(map(tuple, full_df[['Stock', 'Date']].astype(str).values)) if not full_df.empty else set()
+        tail_rows = set(map(tuple, tail_df[['Stock', 'Date']].astype(str).values)) if not tail_df.empty else set()
+        if full_rows != tail_rows:
+            differences.append(f'{filename}: only in full history {sorted(full_rows - tail_rows)}, only in tail window {sorted(tail_rows - full_rows)}')
+            continue
+        if full_df.empty:
+            continue
+        numeric = full_df.select_dtypes('number').columns
+        full_values = full_df.sort_values('Stock')[numeric].to_numpy(dtype=float)
+        tail_values = tail_df.sort_values('Stock')[numeric].to_numpy(dtype=float)
+        if not np.allclose(full_values, tail_values, rtol=rtol, atol=0, equal_nan=True):
+            differences.append(f'{filename}: values differ by more than rtol={rtol}')
+    return differences
+
+def check_tail_scan(module, frames):
+    """Run a plugin on the full history and on its LOOKBACK tail, report any difference and return True if they agree"""
+    differences = compare_scan_results(module.run_scan(frames), module.run_scan(tail_frames(frames, module.LOOKBACK)))
+    for difference in differences:
+        print(f'Tail-window mismatch in {module.__name__}: {difference}')
+    return not differences
+
+def is_streaming(module):
+    return all(hasattr(module, name) for name in ('make_indicators', 'scan_streaming'))
+
+def run_streaming(module, frames, state_dir=None):
+    """Advance every symbol's checkpointed streaming indicators to its latest bar and scan them.
+
+    Checkpoints are kept per plugin in state_dir/<module name>/, so after the
+    first run each symbol only feeds in the bars added since the last one.
+    """
+    directory = os.path.join(state_dir or STATE_DIR, module.__name__)
+    indicators = {stock: update_symbol(stock, df, module.make_indicators, directory) for stock, df in frames.items() if not df.empty}
+    return module.scan_streaming(frames, indicators)
+
+def check_streaming_scan(module, frames, streamed):
+    """Run a plugin on the full history, report any difference from its streaming scan and return True if they agree"""
+    differences = compare_scan_results(module.run_scan(frames), streamed)
+    for difference in differences:
+        print(f'Streaming mismatch in {module.__name__}: {difference}')
+    return not differences
+
+def discover_scanners(directory):
+    return sorted(glob.glob(os.path.join(directory, '*Scanner.py')))
+
+def load_scanner(script):
+    """Import a scanner script as a module without running its script-mode code"""
+    module_name = os.path.splitext(os.path.basename(script))[0]
+    spec = importlib.util.spec_from_file_location(module_name, script)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def is_plugin(module):
+    return all(hasattr(module, name) for name in ('run_scan', 'STOCKS', 'API_KEY'))
+
+def run_isolated(script, directory):
+    """Run one scanner in its own Python process and read back the CSV files it wrote"""
+    print(f'Executing {script}...')
+    before = {path: os.path.getmtime(path) for path in glob.glob(os.path.join(directory, '*.csv'))}
+    result = subprocess.run(['python', os.path.abspath(script)], cwd=directory, capture_output=True, text=True)
+    if result.returncode != 0:
+        print(f'Error executing {script}:')
+        print(result.stderr)
+        return {}
+    print(f'{script} executed successfully.')
+    outputs = {}
+    for path in glob.glob(os.path.join(directory, '*.csv')):
+        if before.get(path) != os.path.getmtime(path):
+            try:
+                outputs[os.path.basename(path)] = pd.read_csv(path)
+            except pd.errors.EmptyDataError:
+                outputs[os.path.basename(path)] = pd.DataFrame()
+    return outputs
+
+def run_scanners(scripts, directory, isolated=False, write_csv=True, tail=False, check_tail=False, streaming=False, check_streaming=False):
+    """Run every scanner and return {output filename: results DataFrame}.
+
+    By default scanners are imported and called in this process, and the price
+    history for the union of their universes is loaded once and shared. The
+    scanners build their indicators on a PanelIndicators.Panel and only read
+    the frames, so they are handed out without copying. With isolated=True, or for scripts that do not implement
+    the plugin interface, the script is run in a subprocess as before.
+
+    With tail=True, plugins that define LOOKBACK only get their last LOOKBACK
+    bars per symbol. SMAs and slopes are then the same as over the full
+    history, and EWMs are within PanelIndicators.EWM_TOLERANCE of it; with
+    check_tail=True every such plugin is also run on the full history and any
+    difference in the signals found or their values is printed.
+
+    With streaming=True, plugins that define make_indicators/scan_streaming
+    are scanned from their checkpointed streaming indicators instead (see
+    run_streaming()); check_streaming=True also runs them on the full history
+    and prints any difference.
+    """
+    scan_results = {}
+    plugins = {}
+    for script in scripts:
+        if isolated:
+            scan_results.update(run_isolated(script, directory))
+            continue
+        try:
+            module = load_scanner(script)
+        except Exception as e:
+            print(f'Error importing {script}: {e}')
+            continue
+        if is_plugin(module):
+            plugins[script] = module
+        else:
+            scan_results.update(run_isolated(script, directory))
+
+    # Load each symbol once across all plugin scanners (grouped by API key)
+    symbols_by_key = defaultdict(set)
+    for module in plugins.values():
+        symbols_by_key[module.API_KEY].update(module.STOCKS)
+    stock_data = {}
+    for api_key, symbols in symbols_by_key.items():
+        stock_data[api_key] = load_stocks(sorted(symbols), api_key)
+
+    for script, module in plugins.items():
+        print(f'Executing {script} in-process...')
+        shared = stock_data[module.API_KEY]
+        frames = {stock: shared[stock] for stock in module.STOCKS if stock in shared}
+        windowed = hasattr(module, 'LOOKBACK')
+        try:
+            if streaming and is_streaming(module):
+                outputs = run_streaming(module, frames)
+                if check_streaming:
+                    check_streaming_scan(module, frames, outputs)
+            else:
+                if windowed and check_tail:
+                    check_tail_scan(module, frames)
+                outputs = module.run_scan(tail_frames(frames, module.LOOKBACK) if windowed and tail else frames)
+        except Exception as e:
+            print(f'Error executing {script}: {e}')
+            continue
+        for filename, results in outputs.items():
+            if write_csv:
+                results.to_csv(os.path.join(directory, filename), index=False)
+            scan_results[filename] = results
+        print(f'{script} executed successfully.')
+    return scan_results
@@ -1,6 +1,6 @@
-import requests
-import pandas as pd
-import numpy as np
+from DataCache import load_stocks
+from PanelIndicators import Panel, rolling_slope, signal_rows
+from StreamingIndicators import Chain, RollingMean, RollingSlope, latest_values, streaming_rows
 
 # Constants
 API_KEY = 'api_here'  # Replace with your Financial Modeling Prep API key
@@ -21,69 +21,51 @@ STOCKS = [
 SMA_LENGTH = 20
 SLOPE_LENGTH = 20
 
-def fetch_historical_data(symbol, api_key):
-    url = f'https://financialmodelingprep.com/api/v3/historical-price-full/{symbol}?apikey={api_key}'
-    response = requests.get(url)
-    data = response.json()
-    if 'historical' in data:
-        df = pd.DataFrame(data['historical'])
-        df['date'] = pd.to_datetime(df['date'])
-        df.set_index('date', inplace=True)
-        df.sort_index(inplace=True)
-        return df
-    else:
-        return pd.DataFrame()
+# Bars each scan needs: the SMA, the regression window over it and the previous bar's slope
+LOOKBACK = SMA_LENGTH + SLOPE_LENGTH
 
-def calculate_sma(df, length):
-    return df['close'].rolling(window=length).mean()
+def scan_stocks(stock_data):
+    # SMA and slope for every symbol at once, read back at each symbol's latest bar
+    panel = Panel(stock_data)
+    sma = panel.sma(SMA_LENGTH)
+    slope = rolling_slope(sma, SLOPE_LENGTH)
+    recent_slope, previous_slope = panel.latest(slope), panel.latest(slope, 1)
+    positive_slope_change = (recent_slope > 0) & (previous_slope <= 0)
+    negative_slope_change = (recent_slope < 0) & (previous_slope >= 0)
+    return signal_rows(panel, positive_slope_change | negative_slope_change, {
+        'Close': panel.latest(panel.close),
+        'SMA': panel.latest(sma),
+        'Slope': recent_slope,
+        'Signal': positive_slope_change.map({True: 'Buy', False: 'Sell'})
+    })
 
-def calculate_slope(series, length):
-    """Calculate the slope of the series using linear regression"""
-    x = np.arange(length)
-    slopes = [np.nan] * (length - 1)
-    for i in range(length, len(series) + 1):
-        y = series[i-length:i]
-        if len(y.dropna()) == length:
-            slope = np.polyfit(x, y, 1)[0]
-            slopes.append(slope)
-        else:
-            slopes.append(np.nan)
-    return np.array(slopes)
+FILENAME = 'sma_slope_scanner_results.csv'
 
-def scan_stocks(stocks, api_key):
-    results = []
-    for stock in stocks:
-        df = fetch_historical_data(stock, api_key)
-        if not df.empty:
-            df['SMA'] = calculate_sma(df, SMA_LENGTH)
-            df['Slope'] = calculate_slope(df['SMA'], SLOPE_LENGTH)
-            df['Positive_Slope_Change'] = (df['Slope'] > 0) & (df['Slope'].shift(1) <= 0)
-            df['Negative_Slope_Change'] = (df['Slope'] < 0) & (df['Slope'].shift(1) >= 0)
-            latest_date = df.index.max()
-            positive_slope_changes = df[(df['Positive_Slope_Change']) & (df.index == latest_date)]
-            negative_slope_changes = df[(df['Negative_Slope_Change']) & (df.index == latest_date)]
-            for date, row in positive_slope_changes.iterrows():
-                results.append({
-                    'Stock': stock,
-                    'Date': date,
-                    'Close': row['close'],
-                    'SMA': row['SMA'],
-                    'Slope': row['Slope'],
-                    'Signal': 'Buy'
-                })
-            for date, row in negative_slope_changes.iterrows():
-                results.append({
-                    'Stock': stock,
-                    'Date': date,
-                    'Close': row['close'],
-                    'SMA': row['SMA'],
-                    'Slope': row['Slope'],
-                    'Signal': 'Sell'
-                })
-    return pd.DataFrame(results)
+def run_scan(stock_data):
+    """Scanner plugin entry point used by ScanDriver: returns {output filename: results DataFrame}"""
+    return {FILENAME: scan_stocks(stock_data)}
 
-# Scan the stocks and save results to a file
-results = scan_stocks(STOCKS, API_KEY)
-filename = 'sma_slope_scanner_results.csv'
-results.to_csv(filename, index=False)
-print(f'Results saved to {filename}')
+def make_indicators():
+    return {'sma': RollingMean(SMA_LENGTH), 'slope': Chain(RollingMean(SMA_LENGTH), RollingSlope(SLOPE_LENGTH))}
+
+def scan_streaming(stock_data, indicators):
+    # The slope sign changes of scan_stocks, from each symbol's streamed SMA slope
+    latest = latest_values(stock_data, indicators, lambda symbol: {
+        'SMA': symbol['sma'].value,
+        'Slope': symbol['slope'].value,
+        'Previous_Slope': symbol['slope'].previous
+    })
+    positive_slope_change = (latest['Slope'] > 0) & (latest['Previous_Slope'] <= 0)
+    negative_slope_change = (latest['Slope'] < 0) & (latest['Previous_Slope'] >= 0)
+    return {FILENAME: streaming_rows(stock_data, positive_slope_change | negative_slope_change, {
+        'Close': latest['Close'],
+        'SMA': latest['SMA'],
+        'Slope': latest['Slope'],
+        'Signal': positive_slope_change.map({True: 'Buy', False: 'Sell'})
+    })}
+
+if __name__ == '__main__':
+    # Scan the stocks and save results to a file
+    results = scan_stocks(load_stocks(STOCKS, API_KEY))
+    results.to_csv(FILENAME, index=False)
+    print(f'Results saved to {FILENAME}')
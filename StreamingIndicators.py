@@ -0,0 +1,313 @@
+import hashlib
+import json
+import math
+import os
+from collections import deque
+import numpy as np
+import pandas as pd
+
+# Directory holding one JSON checkpoint of streaming indicator state per symbol
+STATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'IndicatorState')
+
+class StreamingIndicator:
+    """Indicator that advances one bar at a time in constant time and memory.
+
+    update(x) folds in the next bar and returns the new value; value and
+    previous hold the latest two outputs, which is all the "today" signals
+    need. The state is plain numbers and deques, so to_dict()/from_dict()
+    round-trip it through JSON for checkpointing. The values follow the pandas
+    computations in Indicators/PanelIndicators up to floating point rounding
+    of the running sums (around 1e-12 relative).
+    """
+
+    def __init__(self):
+        self.value = math.nan
+        self.previous = math.nan
+
+    def update(self, x):
+        self.previous = self.value
+        self.value = self.next_value(float(x))
+        return self.value
+
+    def next_value(self, x):
+        raise NotImplementedError
+
+    def to_dict(self):
+        state = {'type': type(self).__name__}
+        for name, value in vars(self).items():
+            if isinstance(value, StreamingIndicator):
+                value = value.to_dict()
+            elif isinstance(value, deque):
+                value = {'deque': list(value), 'maxlen': value.maxlen}
+            state[name] = value
+        return state
+
+    @staticmethod
+    def from_dict(state):
+        indicator = INDICATORS[state['type']].__new__(INDICATORS[state['type']])
+        for name, value in state.items():
+            if name == 'type':
+                continue
+            if isinstance(value, dict):
+                value = StreamingIndicator.from_dict(value) if 'type' in value else deque(value['deque'], value['maxlen'])
+            setattr(indicator, name, value)
+        return indicator
+
+class RollingMean(StreamingIndicator):
+    """Series.rolling(window, min_periods).mean(); NaN bars are skipped like pandas does"""
+
+    def __init__(self, window, min_periods=None):
+        super().__init__()
+        self.window = window
+        self.min_periods = window if min_periods is None else min_periods
+        self.values = deque(maxlen=window)
+        self.total = 0.0
+        self.count = 0
+
+    def next_value(self, x):
+        if len(self.values) == self.window:
+            dropped = self.values[0]
+            if not math.isnan(dropped):
+                self.total -= dropped
+                self.count -= 1
+        self.values.append(x)
+        if not math.isnan(x):
+            self.total += x
+            self.count += 1
+        if self.count == 0:
+            # Reset the running sum whenever the window is empty so rounding errors never carry over
+            self.total = 0.0
+        return self.total / self.count if self.count >= max(self.min_periods, 1) else math.nan
+
+class EWM(StreamingIndicator):
+    """Series.ewm(span=span, adjust=False).mean() of a series without gaps; a NaN bar repeats the last value"""
+
+    def __init__(self, span):
+        super().__init__()
+        self.span = span
+        self.alpha = 2.0 / (span + 1)
+
+    def next_value(self, x):
+        if math.isnan(x):
+            return self.value
+        if math.isnan(self.value):
+            return x
+        return (1 - self.alpha) * self.value + self.alpha * x
+
+class MACD(StreamingIndicator):
+    """MACD line of the fast and slow EWMs; signal_line and histogram are updated alongside it"""
+
+    def __init__(self, fast=12, slow=26, signal=9):
+        super().__init__()
+        self.fast = EWM(fast)
+        self.slow = EWM(slow)
+        self.signal = EWM(signal)
+        self.signal_line = math.nan
+        self.histogram = math.nan
+
+    def next_value(self, x):
+        macd_line = self.fast.update(x) - self.slow.update(x)
+        self.signal_line = self.signal.update(macd_line)
+        self.histogram = macd_line - self.signal_line
+        return macd_line
+
+class RSI(StreamingIndicator):
+    """RSI from simple rolling means (min_periods=1) of gains and losses, as the scanners compute it"""
+
+    def __init__(self, period=14):
+        super().__init__()
+        self.period = period
+        self.last_close = math.nan
+        self.average_gain = RollingMean(period, min_periods=1)
+        self.average_loss = RollingMean(period, min_periods=1)
+
+    def next_value(self, x):
+        # The first bar has no change, which pandas' where() turns into a zero gain and loss
+        delta = x - self.last_close
+        self.last_close = x
+        gain = self.average_gain.update(delta if delta > 0 else 0.0)
+        loss = self.average_loss.update(-delta if delta < 0 else 0.0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rs = np.float64(gain) / np.float64(loss)
+            return float(100 - (100 / (1 + rs)))
+
+class Shifted(StreamingIndicator):
+    """Another indicator's value from `shift` bars ago, like Series.shift(shift)"""
+
+    def __init__(self, indicator, shift):
+        super().__init__()
+        self.indicator = indicator
+        self.shift = shift
+        self.history = deque(maxlen=shift + 1)
+
+    def next_value(self, x):
+        self.history.append(self.indicator.update(x))
+        return self.history[0] if len(self.history) == self.history.maxlen else math.nan
+
+class Alligator(StreamingIndicator):
+    """Williams Alligator: jaw, teeth and lips as shifted SMAs. value is the jaw; teeth and lips are attributes"""
+
+    def __init__(self, jaw_length=13, jaw_shift=8, teeth_length=8, teeth_shift=5, lips_length=5, lips_shift=3):
+        super().__init__()
+        self.jaw_line = Shifted(RollingMean(jaw_length), jaw_shift)
+        self.teeth_line = Shifted(RollingMean(teeth_length), teeth_shift)
+        self.lips_line = Shifted(RollingMean(lips_length), lips_shift)
+
+    @property
+    def jaw(self):
+        return self.jaw_line.value
+
+    @property
+    def teeth(self):
+        return self.teeth_line.value
+
+    @property
+    def lips(self):
+        return self.lips_line.value
+
+    def next_value(self, x):
+        self.teeth_line.update(x)
+        self.lips_line.update(x)
+        return self.jaw_line.update(x)
+
+class RollingSlope(StreamingIndicator):
+    """Rolling regression slope over `length` bars (Indicators.calculate_slope).
+
+    Keeps sum(y) and sum(k * y) over the window, k = 0..length-1, so sliding by
+    one bar is O(1); windows containing a NaN give NaN. The sums are rebuilt
+    from the window every `length` bars to keep rounding error from drifting.
+    """
+
+    def __init__(self, length):
+        super().__init__()
+        if length < 2:
+            raise ValueError('Slope length must be at least 2')
+        self.length = length
+        self.values = deque(maxlen=length)
+        self.sum_y = 0.0
+        self.sum_ky = 0.0
+        self.missing = 0
+        self.bars = 0
+
+    def next_value(self, x):
+        y = 0.0 if math.isnan(x) else x
+        if len(self.values) == self.length:
+            dropped = self.values[0]
+            if math.isnan(dropped):
+                self.missing -= 1
+                dropped = 0.0
+            # Shift every window position down by one, dropping the oldest bar
+            self.sum_ky -= self.sum_y - dropped
+            self.sum_y -= dropped
+        self.sum_ky += min(len(self.values), self.length - 1) * y
+        self.sum_y += y
+        self.values.append(x)
+        self.missing += math.isnan(x)
+        self.bars += 1
+        if self.bars % self.length == 0:
+            window = np.nan_to_num(np.array(self.values))
+            self.sum_y = float(window.sum())
+            self.sum_ky = float(np.dot(np.arange(len(window)), window))
+        if len(self.values) < self.length or self.missing:
+            return math.nan
+        center = (self.length - 1) / 2
+        return (self.sum_ky - center * self.sum_y) / (self.length * (self.length ** 2 - 1) / 12)
+
+class Chain(StreamingIndicator):
+    """One indicator applied to the values of another, e.g. the rolling slope of an SMA"""
+
+    def __init__(self, inner, outer):
+        super().__init__()
+        self.inner = inner
+        self.outer = outer
+
+    def next_value(self, x):
+        return self.outer.update(self.inner.update(x))
+
+INDICATORS = {cls.__name__: cls for cls in (RollingMean, EWM, MACD, RSI, Shifted, Alligator, RollingSlope, Chain)}
+
+def indicator_spec(indicators):
+    """Fingerprint of freshly built {name: StreamingIndicator}: their names, types and parameters"""
+    state = {name: indicator.to_dict() for name, indicator in indicators.items()}
+    return hashlib.sha256(json.dumps(state, sort_keys=True).encode()).hexdigest()
+
+def state_path(symbol, state_dir=None):
+    return os.path.join(state_dir or STATE_DIR, f'{symbol}.json')
+
+def save_state(symbol, last_date, last_close, indicators, spec, state_dir=None):
+    """Checkpoint {name: StreamingIndicator} built as `spec` (indicator_spec()) as of the bar on last_date"""
+    path = state_path(symbol, state_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({
+            'spec': spec,
+            'last_date': str(last_date),
+            'last_close': last_close,
+            'indicators': {name: indicator.to_dict() for name, indicator in indicators.items()}
+        }, f)
+    os.replace(tmp_path, path)
+
+def load_state(symbol, spec, state_dir=None):
+    """Return (last_date, last_close, {name: StreamingIndicator}) from the checkpoint, or (None, None, None)
+    when there is none or it was built with indicators other than `spec`"""
+    try:
+        with open(state_path(symbol, state_dir), 'r') as f:
+            state = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None, None, None
+    if state.get('spec') != spec:
+        return None, None, None
+    return state['last_date'], state['last_close'], {name: StreamingIndicator.from_dict(indicator) for name, indicator in state['indicators'].items()}
+
+def update_symbol(symbol, df, make_indicators, state_dir=None):
+    """Advance a symbol's checkpointed indicators to its latest bar and return them.
+
+    df must hold the symbol's full history, as the checkpoint was built from
+    its first bar. make_indicators() builds fresh {name: StreamingIndicator}
+    for the symbol; they are used from the first bar when there is no
+    checkpoint, when it was built by different indicators or parameters, or
+    when its bar is no longer in df or has a different close (e.g. history
+    adjusted for a split). Only bars after the checkpoint are fed in. The newest bar may still
+    be revised by a later download (DataCache re-fetches it), so the checkpoint
+    is written just before it and the returned indicators include it.
+    """
+    closes = df['close']
+    values = closes.to_numpy(dtype=float)
+    fresh = make_indicators()
+    spec = indicator_spec(fresh)
+    last_date, last_close, indicators = load_state(symbol, spec, state_dir)
+    position = closes.index.searchsorted(pd.Timestamp(last_date)) if last_date is not None else len(closes)
+    if (indicators is None or position >= len(closes) or closes.index[position] != pd.Timestamp(last_date)
+            or values[position] != last_close):
+        indicators = fresh
+        start = 0
+    else:
+        start = position + 1
+
+    for x in values[start:-1]:
+        for indicator in indicators.values():
+            indicator.update(x)
+    if len(values) > 1 and start < len(values) - 1:
+        save_state(symbol, closes.index[-2], float(values[-2]), indicators, spec, state_dir)
+    if start < len(values):
+        for indicator in indicators.values():
+            indicator.update(values[-1])
+    return indicators
+
+def latest_values(stock_data, indicators, read):
+    """Per-symbol frame of the latest close and read({name: StreamingIndicator}) -> {column: value}"""
+    return pd.DataFrame.from_dict({
+        stock: {'Close': float(stock_data[stock]['close'].iloc[-1]), **read(symbol_indicators)}
+        for stock, symbol_indicators in indicators.items()
+    }, orient='index')
+
+def streaming_rows(stock_data, hits, columns):
+    """Scanner results for the symbols where hits is True, laid out like PanelIndicators.signal_rows"""
+    stocks = hits.index[hits.to_numpy(dtype=bool)]
+    if stocks.empty:
+        return pd.DataFrame()
+    rows = {'Stock': stocks.to_numpy(), 'Date': pd.DatetimeIndex([stock_data[stock].index[-1] for stock in stocks]).to_numpy()}
+    for name, values in columns.items():
+        rows[name] = values[stocks].to_numpy() if isinstance(values, pd.Series) else values
+    return pd.DataFrame(rows)
@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+
+# Exit reason codes stored in the ledger, and their names in trade logs
+OPEN = 0
+SIGNAL = 1
+STOP = 2
+EXIT_REASONS = ['Open', 'Signal', 'Stop']
+
+class TradeLedger:
+    """Trades of a simulation as typed column arrays, one row per position.
+
+    A position is opened with open() and later closed with close(); positions
+    still open keep exit_index -1, a NaN exit price and the OPEN reason, so
+    nothing is lost when a backtest ends while holding. The arrays grow by
+    doubling, so appending is amortized O(1) without a Python object per
+    fill, and the properties and to_frame() return views of the filled rows.
+    """
+
+    def __init__(self, capacity=16):
+        self.size = 0
+        self.data = {
+            'entry_index': np.empty(capacity, dtype=np.int32),
+            'exit_index': np.empty(capacity, dtype=np.int32),
+            'entry_price': np.empty(capacity, dtype=float),
+            'exit_price': np.empty(capacity, dtype=float),
+            'quantity': np.empty(capacity, dtype=float),
+            'exit_reason': np.empty(capacity, dtype=np.int8)
+        }
+
+    def __len__(self):
+        return self.size
+
+    def open(self, index, price, quantity):
+        """Record a new position bought at bar `index` and return its trade number"""
+        if self.size == len(self.data['entry_index']):
+            for name, values in self.data.items():
+                grown = np.empty(2 * len(values), dtype=values.dtype)
+                grown[:self.size] = values[:self.size]
+                self.data[name] = grown
+        trade = self.size
+        self.data['entry_index'][trade] = index
+        self.data['exit_index'][trade] = -1
+        self.data['entry_price'][trade] = price
+        self.data['exit_price'][trade] = np.nan
+        self.data['quantity'][trade] = quantity
+        self.data['exit_reason'][trade] = OPEN
+        self.size += 1
+        return trade
+
+    def close(self, trade, index, price, reason=SIGNAL):
+        self.data['exit_index'][trade] = index
+        self.data['exit_price'][trade] = price
+        self.data['exit_reason'][trade] = reason
+
+    def column(self, name):
+        return self.data[name][:self.size]
+
+    @property
+    def entry_index(self):
+        return self.column('entry_index')
+
+    @property
+    def exit_index(self):
+        return self.column('exit_index')
+
+    @property
+    def entry_price(self):
+        return self.column('entry_price')
+
+    @property
+    def exit_price(self):
+        return self.column('exit_price')
+
+    @property
+    def quantity(self):
+        return self.column('quantity')
+
+    @property
+    def exit_reason(self):
+        return self.column('exit_reason')
+
+    @property
+    def closed(self):
+        return self.exit_reason != OPEN
+
+    def profit_loss(self):
+        """Profit/Loss of every closed position"""
+        closed = self.closed
+        return (self.exit_price[closed] - self.entry_price[closed]) * self.quantity[closed]
+
+    def cash_and_shares(self, bars, initial_cash):
+        """Cash and shares held after each of `bars` bars, from the entries and exits in the ledger"""
+        closed = self.closed
+        cash = np.zeros(bars)
+        shares = np.zeros(bars)
+        np.add.at(cash, self.entry_index, -self.entry_price * self.quantity)
+        np.add.at(cash, self.exit_index[closed], self.exit_price[closed] * self.quantity[closed])
+        np.add.at(shares, self.entry_index, self.quantity)
+        np.add.at(shares, self.exit_index[closed], -self.quantity[closed])
+        if bars:
+            cash[0] += initial_cash
+        return np.cumsum(cash), np.cumsum(shares)
+
+    def to_frame(self):
+        """DataFrame of the ledger columns; the columns are views of the ledger arrays, not copies"""
+        return pd.DataFrame({name: self.column(name) for name in self.data}, copy=False)
+
+    def trade_log(self, dates):
+        """Trade log with dates and the BacktestEngine.TRADE_LOG_COLUMNS; open positions have no exit or Profit/Loss"""
+        closed = self.closed
+        return pd.DataFrame({
+            'Date Bought': dates[self.entry_index],
+            'Date Sold': dates[np.where(closed, self.exit_index, 0)].where(closed),
+            'Quantity': self.quantity,
+            'Entry Price': self.entry_price,
+            'Exit Price': self.exit_price,
+            'Profit/Loss': (self.exit_price - self.entry_price) * self.quantity,
+            'Stopped Out': self.exit_reason == STOP,
+            'Exit Reason': pd.Categorical.from_codes(self.exit_reason, EXIT_REASONS)
+        }, copy=False)
@@ -0,0 +1,159 @@
+import argparse
+import os
+import warnings
+from contextlib import closing
+import numpy as np
+import pandas as pd
+from ResultCache import RESULT_CACHE_DIR
+from ResultsDB import RESULTS_DB, connect, load_closed_profit_loss
+
+# Resamples per trade log, two-sided confidence level of the intervals, and
+# memory budget of one batch of resampled trade matrices
+SAMPLES = 2000
+CONFIDENCE = 0.95
+BATCH_BYTES = 64 * 1024 * 1024
+
+def skip_directory(path):
+    """True for directories holding no results of their own: the backtest result cache, whose entries copy the
+    trade logs of the results directories, and the .tmp directories of entries still being written"""
+    return (path.endswith('.tmp') or os.path.basename(path) == os.path.basename(RESULT_CACHE_DIR)
+            or os.path.realpath(path) == os.path.realpath(RESULT_CACHE_DIR))
+
+def load_trade_logs(start_directory='.'):
+    """{results directory: Profit/Loss array of the closed trades} for every trading_log.csv under start_directory"""
+    logs = {}
+    for root, dirnames, files in os.walk(start_directory):
+        dirnames[:] = [name for name in dirnames if not skip_directory(os.path.join(root, name))]
+        if 'trading_log.csv' in files:
+            file_path = os.path.join(root, 'trading_log.csv')
+            try:
+                profit_loss = pd.read_csv(file_path, usecols=['Profit/Loss'])['Profit/Loss'].to_numpy(dtype=float)
+                # A position still open at the end of the backtest has no Profit/Loss yet
+                logs[os.path.relpath(root, start_directory)] = profit_loss[~np.isnan(profit_loss)]
+            except Exception as e:
+                print(f"Error reading {file_path}: {e}")
+    return logs
+
+def trade_statistics(columns, counts):
+    """Win rate (%), profit factor and maximum drawdown of many trade sequences at once.
+
+    columns yields one (logs, ...) array per trade position holding the next
+    trade of every sequence, 0 past the end of a log's counts[i] trades.
+    Taking one position at a time keeps each step a vectorized operation over
+    all sequences, without (sequences, trades) matrices. The drawdown is the
+    largest fall of the cumulative Profit/Loss from its running peak, starting at 0.
+    """
+    wins = gross_profit = equity = peak = drawdown = None
+    for trade in columns:
+        if wins is None:
+            wins, gross_profit, equity, peak, drawdown = (np.zeros(trade.shape) for _ in range(5))
+        wins += trade > 0
+        gross_profit += np.maximum(trade, 0)
+        equity += trade
+        np.maximum(peak, equity, out=peak)
+        np.maximum(drawdown, peak - equity, out=drawdown)
+    gross_loss = gross_profit - equity
+    counts = counts.reshape((-1,) + (1,) * (np.ndim(wins) - 1))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        win_rate = np.where(counts > 0, wins / counts * 100, np.nan)
+        # No losses give an infinite profit factor, but with no profit either (0/0) it is undefined, as in RankSimple
+        profit_factor = np.where((counts > 0) & ((gross_loss != 0) | (gross_profit != 0)),
+                                 np.where(gross_loss != 0, gross_profit / gross_loss, np.inf), np.nan)
+    return win_rate, profit_factor, drawdown
+
+def bootstrap_columns(profit_loss, counts, samples, rng):
+    """Trade positions of `samples` bootstrap resamples per log: counts[i] trades drawn with replacement"""
+    logs, trades = profit_loss.shape
+    rows = np.arange(logs)[:, None]
+    for position in range(trades):
+        picks = (rng.random((logs, samples)) * counts[:, None]).astype(np.int64)
+        yield np.where(position < counts[:, None], profit_loss[rows, picks], 0.0)
+
+def permutation_columns(profit_loss, samples, rng):
+    """Trade positions of `samples` random orders of each log's trades.
+
+    The zero padding is shuffled in with the trades; zeros do not move the
+    cumulative Profit/Loss, so the statistics are those of the log's own trades.
+    """
+    logs, trades = profit_loss.shape
+    shuffled = rng.permuted(np.broadcast_to(profit_loss[:, None, :], (logs, samples, trades)), axis=-1)
+    for position in range(trades):
+        yield shuffled[:, :, position]
+
+def confidence_intervals(logs, samples=SAMPLES, confidence=CONFIDENCE, seed=None):
+    """Point estimates and confidence intervals of win rate, profit factor and drawdown for every trade log.
+
+    Logs are sorted by trade count and resampled in batches sized to
+    BATCH_BYTES, so each batch is only padded to its own longest log.
+    Returns one row per log.
+    """
+    rng = np.random.default_rng(seed)
+    names = sorted(logs, key=lambda name: len(logs[name]))
+    q = [(1 - confidence) / 2, (1 + confidence) / 2]
+    rows = []
+    start = 0
+    while start < len(names):
+        trades = max(len(logs[names[start]]), 1)
+        # Grow the batch while the (logs, samples, trades) matrix of shuffled trades fits the budget
+        end = start + 1
+        while end < len(names) and (end + 1 - start) * samples * max(len(logs[names[end]]), 1) * 8 <= BATCH_BYTES:
+            trades = max(len(logs[names[end]]), 1)
+            end += 1
+        batch = names[start:end]
+        counts = np.array([len(logs[name]) for name in batch])
+        profit_loss = np.zeros((len(batch), trades))
+        for i, name in enumerate(batch):
+            profit_loss[i, :counts[i]] = logs[name]
+
+        win_rate, profit_factor, drawdown = trade_statistics(profit_loss.T, counts)
+        boot_win_rate, boot_profit_factor, boot_drawdown = trade_statistics(bootstrap_columns(profit_loss, counts, samples, rng), counts)
+        # Reordering trades leaves the win rate and profit factor unchanged, so permutations only give drawdowns
+        _, _, permuted_drawdown = trade_statistics(permutation_columns(profit_loss, samples, rng), counts)
+        # 'nearest' keeps infinite profit factors (resamples without a loss) from turning the bounds into NaN,
+        # and resamples whose profit factor is undefined (no profit and no loss) are left out of its bounds
+        bounds = [np.quantile(values, q, axis=1, method='nearest') for values in (boot_win_rate, boot_profit_factor, boot_drawdown)]
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            bounds[1] = np.nanquantile(boot_profit_factor, q, axis=1, method='nearest')
+        permuted = np.quantile(permuted_drawdown, [0.5, q[1]], axis=1, method='nearest')
+        for i, name in enumerate(batch):
+            rows.append({
+                'Results': name,
+                'Total Trades': int(counts[i]),
+                'Percent Profitable': win_rate[i],
+                'Percent Profitable Low': bounds[0][0, i],
+                'Percent Profitable High': bounds[0][1, i],
+                'Profit Factor': profit_factor[i],
+                'Profit Factor Low': bounds[1][0, i],
+                'Profit Factor High': bounds[1][1, i],
+                'Max Drawdown': drawdown[i],
+                'Max Drawdown Low': bounds[2][0, i],
+                'Max Drawdown High': bounds[2][1, i],
+                'Permuted Max Drawdown Median': permuted[0, i],
+                'Permuted Max Drawdown High': permuted[1, i]
+            })
+        start = end
+    return pd.DataFrame(rows).sort_values('Results', kind='stable').reset_index(drop=True)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Bootstrap and permutation confidence intervals for every trading_log.csv')
+    parser.add_argument('directory', nargs='?', default='.', help='Directory to search for trade logs (default: current directory)')
+    parser.add_argument('--db', action='store_true', help='Resample the newest trade logs in the results database instead of trading_log.csv files')
+    parser.add_argument('--samples', type=int, default=SAMPLES, help=f'Resamples per trade log (default: {SAMPLES})')
+    parser.add_argument('--confidence', type=float, default=CONFIDENCE, help=f'Confidence level of the intervals (default: {CONFIDENCE})')
+    parser.add_argument('--seed', type=int, default=None, help='Random seed')
+    parser.add_argument('--output', default='trade_resampling.csv', help='CSV file for the results')
+    args = parser.parse_args()
+
+    if args.db:
+        with closing(connect()) as conn:
+            logs = load_closed_profit_loss(conn)
+    else:
+        logs = load_trade_logs(args.directory)
+    if not logs:
+        print(f'No trade logs found in {RESULTS_DB if args.db else args.directory}')
+    else:
+        results = confidence_intervals(logs, args.samples, args.confidence, args.seed)
+        results.to_csv(args.output, index=False)
+        print(results)
+        print(f'Confidence intervals for {len(results)} trade logs saved to {args.output}')
@@ -0,0 +1,128 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+from BacktestEngine import simulate_trades, stop_settings
+from PerformanceMetrics import performance_metrics
+from BacktestRunner import STRATEGIES, load_backtest
+from DataCache import load_stocks
+from FMPClient import reset_clients
+from ParameterSweep import SWEEPS, SORT_BY, parameter_grid, parse_values, load_strategy, prime_smas
+
+# In-sample history before each out-of-sample window, and the number of out-of-sample windows
+TRAIN_YEARS = 2
+FOLDS = 10
+
+def fold_windows(dates, folds=FOLDS, train_years=TRAIN_YEARS):
+    """(train start, test start, test end) bar positions of each fold.
+
+    The bars after the first train_years of history are split into `folds`
+    consecutive out-of-sample windows, and each one's in-sample window is the
+    train_years of bars just before it.
+    """
+    train = pd.Timedelta(days=train_years * 365)
+    first_test = dates.searchsorted(dates[0] + train)
+    windows = []
+    for test in np.array_split(np.arange(first_test, len(dates)), folds):
+        if len(test):
+            windows.append((dates.searchsorted(dates[test[0]] - train), test[0], test[-1] + 1))
+    return windows
+
+def window_metrics(module, prices, signal, start, end):
+    """Performance metrics of simulate() on bars start:end, straight from the arrays.
+
+    prices holds the close, open, high and low arrays of the full history.
+    """
+    close, open_, high, low = (values[start:end] for values in prices)
+    ledger = simulate_trades(close, signal[start:end], module.INITIAL_CASH, module.PERCENT_TO_INVEST,
+                             **stop_settings(module.config), open_=open_, high=high, low=low)
+    cash, shares = ledger.cash_and_shares(len(close), module.INITIAL_CASH)
+    return performance_metrics(ledger.profit_loss(), ledger.entry_index, ledger.exit_index, cash + shares * close)
+
+def walk_forward(strategy, symbol, combinations, folds=FOLDS, train_years=TRAIN_YEARS, sort_by=SORT_BY):
+    """Walk-forward test of a strategy's parameters on one symbol.
+
+    For every fold the combination with the best in-sample sort_by is picked
+    and then backtested on the out-of-sample window that follows. Signals
+    only look back, so the indicators and signals of each combination are
+    computed once over the full history and every window just slices them;
+    each window is then simulated from flat with INITIAL_CASH like a backtest
+    over those bars alone. Returns one row per fold with the chosen
+    parameters, their in-sample score and their out-of-sample metrics.
+    """
+    module, df = load_strategy(strategy, symbol)
+    if df.empty:
+        print(f'No price data for {symbol}')
+        return pd.DataFrame()
+    prime_smas(strategy, df, combinations)
+    prices = [df[column].to_numpy(dtype=float) if column in df else df['close'].to_numpy(dtype=float) for column in ('close', 'open', 'high', 'low')]
+    signals = [module.generate_signals(df.copy(), **params)['Signal'].to_numpy(dtype=float) for params in combinations]
+
+    rows = []
+    for fold, (start, test_start, end) in enumerate(fold_windows(df.index, folds, train_years), 1):
+        scores = np.array([window_metrics(module, prices, signal, start, test_start)[sort_by] for signal in signals], dtype=float)
+        best = int(np.argmax(np.where(np.isnan(scores), -np.inf, scores)))
+        rows.append({
+            'Symbol': symbol,
+            'Fold': fold,
+            'Train Start': df.index[start],
+            'Test Start': df.index[test_start],
+            'Test End': df.index[end - 1],
+            **combinations[best],
+            f'In-Sample {sort_by}': scores[best],
+            **window_metrics(module, prices, signals[best], test_start, end)
+        })
+    return pd.DataFrame(rows)
+
+def run_walk_forward(strategy, symbols, combinations, folds=FOLDS, train_years=TRAIN_YEARS, sort_by=SORT_BY, max_workers=None):
+    """walk_forward() for many symbols on a process pool; returns {symbol: folds DataFrame}"""
+    load_stocks(symbols, load_backtest(STRATEGIES[strategy][0]).API_KEY)
+    results = {}
+    with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count(), initializer=reset_clients) as executor:
+        futures = {executor.submit(walk_forward, strategy, symbol, combinations, folds, train_years, sort_by): symbol for symbol in symbols}
+        for future in as_completed(futures):
+            symbol = futures[future]
+            try:
+                results[symbol] = future.result()
+            except Exception as e:
+                print(f'Error running walk-forward for {symbol}: {e}')
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Walk-forward test of strategy parameters: optimize in-sample, evaluate out-of-sample')
+    parser.add_argument('strategy', choices=sorted(STRATEGIES), help='Strategy to test')
+    parser.add_argument('symbols', nargs='+', help='Stock symbols to test')
+    parser.add_argument('--param', action='append', default=[], metavar='NAME=VALUES',
+                        help="generate_signals parameter and its values as start:stop:step or v1,v2,... (repeatable; replaces the default grid)")
+    parser.add_argument('--folds', type=int, default=FOLDS, help=f'Out-of-sample windows (default: {FOLDS})')
+    parser.add_argument('--train-years', type=float, default=TRAIN_YEARS, help=f'In-sample history before each window (default: {TRAIN_YEARS})')
+    parser.add_argument('--sort-by', default=SORT_BY, help=f'In-sample metric to optimize (default: {SORT_BY})')
+    parser.add_argument('--max-workers', type=int, default=None, help='Worker processes (default: one per core)')
+    args = parser.parse_args()
+
+    defaults = SWEEPS.get(args.strategy, {'grid': {}, 'valid': None})
+    grid = dict(param.split('=', 1) for param in args.param)
+    grid = {name: parse_values(values) for name, values in grid.items()} if grid else defaults['grid']
+    combinations = parameter_grid(grid, defaults['valid'] if not args.param else None)
+    print(f'Walk-forward testing {len(combinations)} parameter combinations of {args.strategy} on {len(args.symbols)} symbol(s)')
+
+    module = load_backtest(STRATEGIES[args.strategy][0])
+    results = run_walk_forward(args.strategy, args.symbols, combinations, args.folds, args.train_years, args.sort_by, args.max_workers)
+    summary = []
+    for symbol in args.symbols:
+        folds_df = results.get(symbol)
+        if folds_df is None or folds_df.empty:
+            continue
+        output_dir = os.path.join(module.RESULTS_DIR, symbol)
+        os.makedirs(output_dir, exist_ok=True)
+        folds_df.to_csv(os.path.join(output_dir, 'walk_forward.csv'), index=False)
+        summary.append({
+            'Symbol': symbol,
+            'Folds': len(folds_df),
+            f'In-Sample {args.sort_by}': folds_df[f'In-Sample {args.sort_by}'].mean(),
+            'Out-of-Sample Total Profit/Loss': folds_df['Total Profit/Loss'].sum(),
+            'Out-of-Sample Trades': folds_df['Total Trades'].sum()
+        })
+    print(pd.DataFrame(summary))
+    print(f'Fold results saved to {module.RESULTS_DIR}/<symbol>/walk_forward.csv')
@@ -1,5 +1,6 @@
-import requests
-import pandas as pd
+from DataCache import load_stocks
+from PanelIndicators import Panel, signal_rows
+from StreamingIndicators import Alligator, RollingMean, latest_values, streaming_rows
 
 # Constants
 API_KEY = 'api_here'  # Replace with your Financial Modeling Prep API key
@@ -43,58 +44,59 @@ STOCKS = [
     "XLU"                         # Utilities Select Sector SPDR Fund
 ]
 
-def fetch_historical_data(symbol, api_key):
-    url = f'https://financialmodelingprep.com/api/v3/historical-price-full/{symbol}?apikey={api_key}'
-    response = requests.get(url)
-    data = response.json()
-    if 'historical' in data:
-        df = pd.DataFrame(data['historical'])
-        df['date'] = pd.to_datetime(df['date'])
-        df.set_index('date', inplace=True)
-        df.sort_index(inplace=True)
-        return df
-    else:
-        return pd.DataFrame()
+# Bars each scan needs: SMA_200 today (the shifted Alligator lines need fewer)
+LOOKBACK = 200
 
-def calculate_smas(df, jaw_length=13, jaw_shift=8, teeth_length=8, teeth_shift=5, lips_length=5, lips_shift=3):
-    df['SMA_Jaw'] = df['close'].rolling(window=jaw_length).mean().shift(jaw_shift)
-    df['SMA_Teeth'] = df['close'].rolling(window=teeth_length).mean().shift(teeth_shift)
-    df['SMA_Lips'] = df['close'].rolling(window=lips_length).mean().shift(lips_shift)
-    df['SMA_200'] = df['close'].rolling(window=200).mean()
-    return df
+def calculate_smas(panel, jaw_length=13, jaw_shift=8, teeth_length=8, teeth_shift=5, lips_length=5, lips_shift=3):
+    # All four SMAs from one prefix-sum pass
+    smas = panel.smas([jaw_length, teeth_length, lips_length, 200])
+    return {
+        'SMA_Jaw': smas[jaw_length].shift(jaw_shift),
+        'SMA_Teeth': smas[teeth_length].shift(teeth_shift),
+        'SMA_Lips': smas[lips_length].shift(lips_shift),
+        'SMA_200': smas[200]
+    }
 
-def detect_alligator_signals(df):
-    df['Teeth_above_Jaw'] = df['SMA_Teeth'] > df['SMA_Jaw']
-    df['Teeth_above_Jaw'] = df['Teeth_above_Jaw'].astype(bool)
-    df['Teeth_crossed_Jaw'] = df['Teeth_above_Jaw'] & (~df['Teeth_above_Jaw'].shift(1).fillna(False).astype(bool))
-    df['Buy_Signal'] = df['Teeth_crossed_Jaw'] & (df['SMA_Lips'] > df['SMA_Teeth']) & (df['SMA_Lips'] > df['SMA_Jaw']) & (df['close'] > df['SMA_200'])
-    return df
+def detect_alligator_signals(panel, smas):
+    def teeth_above_jaw(offset):
+        return panel.latest(smas['SMA_Teeth'], offset) > panel.latest(smas['SMA_Jaw'], offset)
+    recent = {name: panel.latest(values) for name, values in smas.items()}
+    teeth_crossed_jaw = teeth_above_jaw(0) & ~teeth_above_jaw(1)
+    return teeth_crossed_jaw & (recent['SMA_Lips'] > recent['SMA_Teeth']) & (recent['SMA_Lips'] > recent['SMA_Jaw']) & (panel.latest(panel.close) > recent['SMA_200'])
 
-def scan_stocks(stocks, api_key):
-    results = []
-    for stock in stocks:
-        df = fetch_historical_data(stock, api_key)
-        if not df.empty:
-            df = calculate_smas(df)
-            df = detect_alligator_signals(df)
-            latest_date = df.index.max()
-            buy_signals = df[(df['Buy_Signal']) & (df.index == latest_date)]
-            for date, row in buy_signals.iterrows():
-                results.append({
-                    'Stock': stock,
-                    'Date': date,
-                    'Close': row['close'],
-                    'SMA_Jaw': row['SMA_Jaw'],
-                    'SMA_Teeth': row['SMA_Teeth'],
-                    'SMA_Lips': row['SMA_Lips'],
-                    'SMA_200': row['SMA_200']
-                })
-    return pd.DataFrame(results)
+def scan_stocks(stock_data):
+    # Alligator lines for every symbol at once, checked on each symbol's latest bar
+    panel = Panel(stock_data)
+    smas = calculate_smas(panel)
+    buy_signals = detect_alligator_signals(panel, smas)
+    columns = {'Close': panel.latest(panel.close)}
+    columns.update({name: panel.latest(values) for name, values in smas.items()})
+    return signal_rows(panel, buy_signals, columns)
 
-# Run the scanner
-results = scan_stocks(STOCKS, API_KEY)
+FILENAME = 'williams_alligator_buy_signals_today.csv'
 
-# Save the results to a CSV file
-filename = 'williams_alligator_buy_signals_today.csv'
-results.to_csv(filename, index=False)
-print(f'Results saved to {filename}')
+def run_scan(stock_data):
+    """Scanner plugin entry point used by ScanDriver: returns {output filename: results DataFrame}"""
+    return {FILENAME: scan_stocks(stock_data)}
+
+def make_indicators():
+    return {'alligator': Alligator(), 'sma_200': RollingMean(200)}
+
+def scan_streaming(stock_data, indicators):
+    # The same checks as detect_alligator_signals, on each symbol's streamed indicators
+    latest = latest_values(stock_data, indicators, lambda symbol: {
+        'SMA_Jaw': symbol['alligator'].jaw,
+        'SMA_Teeth': symbol['alligator'].teeth,
+        'SMA_Lips': symbol['alligator'].lips,
+        'SMA_200': symbol['sma_200'].value,
+        'Teeth_Above_Jaw_Before': symbol['alligator'].teeth_line.previous > symbol['alligator'].jaw_line.previous
+    })
+    teeth_crossed_jaw = (latest['SMA_Teeth'] > latest['SMA_Jaw']) & ~latest['Teeth_Above_Jaw_Before'].astype(bool)
+    buy_signals = teeth_crossed_jaw & (latest['SMA_Lips'] > latest['SMA_Teeth']) & (latest['SMA_Lips'] > latest['SMA_Jaw']) & (latest['Close'] > latest['SMA_200'])
+    return {FILENAME: streaming_rows(stock_data, buy_signals, {name: latest[name] for name in ['Close', 'SMA_Jaw', 'SMA_Teeth', 'SMA_Lips', 'SMA_200']})}
+
+if __name__ == '__main__':
+    # Scan the stocks and save results to a file
+    results = scan_stocks(load_stocks(STOCKS, API_KEY))
+    results.to_csv(FILENAME, index=False)
+    print(f'Results saved to {FILENAME}')